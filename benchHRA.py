@@ -0,0 +1,76 @@
+from timeit import repeat
+
+from interpreter.lexer import lexer
+from interpreter.parser import parser
+
+
+# Rows the generated program is made of, {} is filled in with the row number
+benchRows = [
+    'make function function_{}',
+    'plus memory pointer by 1',
+    'min memory pointer by 1',
+    'move memory pointer to 3',
+    'move memory to 2',
+    'not equal compare between 0 1',
+    'greater compare between 1 2',
+    'increment memory pointer by 7',
+    'multiply memory pointer by 2',
+    '~ comment on row {}',
+    'show memory',
+    'close function',
+]
+
+
+def makeProgram(rows: int) -> str:
+    """
+    Generate a program with the given amount of rows
+    :param rows: Amount of rows
+    :return: Content of the program
+    """
+    program = list(map(lambda row: benchRows[row % len(benchRows)].format(row), range(rows)))
+
+    # Close the last function when the rows stop inside of it
+    if rows % len(benchRows):
+        program.append('close function')
+    return '\n'.join(program + ['exit', ''])
+
+
+def printResult(stage: str, rows: int, fastest: float, amount: int, unit: str):
+    """
+    Print the result of a benchmark as a row of the table
+    :param stage: Name of the benchmarked stage
+    :param rows: Amount of rows of the generated program
+    :param fastest: Time of the fastest run in seconds
+    :param amount: Amount of handled items in a run
+    :param unit: Name of the handled items
+    """
+    print(stage.ljust(10), f'{rows} rows'.ljust(15), f'{fastest:.3f} s'.ljust(12),
+          f'{rows / fastest:,.0f} rows/s'.ljust(20), f'{amount / fastest:,.0f} {unit}/s')
+
+
+def benchLexer(rows: int = 100000, repeats: int = 5):
+    """
+    Print the throughput of the lexer on a generated program
+    :param rows: Amount of rows of the generated program
+    :param repeats: Amount of times the lexer runs, the fastest run is used
+    """
+    program = makeProgram(rows)
+    fastest = min(repeat(lambda: lexer(program), number=1, repeat=repeats))
+    printResult('Lexer', rows, fastest, len(program.split()), 'words')
+
+
+def benchParser(rows: int = 100000, repeats: int = 5):
+    """
+    Print the throughput of the parser on the tokens of a generated program
+    :param rows: Amount of rows of the generated program
+    :param repeats: Amount of times the parser runs, the fastest run is used
+    """
+    found_tokens = lexer(makeProgram(rows))
+    fastest = min(repeat(lambda: parser(found_tokens), number=1, repeat=repeats))
+    printResult('Parser', rows, fastest, len(found_tokens), 'nodes')
+
+
+if __name__ == '__main__':
+    print('Stage'.ljust(11), 'Size'.ljust(16), 'Time'.ljust(13), 'Throughput', sep='')
+    benchLexer()
+    benchParser()
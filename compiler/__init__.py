@@ -1 +1,2 @@
-from .compiler import compiler, outputReader
+from .compiler import compiler, writeAssembly, outputReader, inputWriter
+from .toolchain import toolchainAvailable, buildProgram, runProgram
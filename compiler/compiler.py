@@ -1,10 +1,13 @@
-from typing import List, Optional, Any, Dict
+from io import StringIO
+from dataclasses import dataclass, field
+from typing import List, Optional, Any, Dict, TextIO, Tuple
 
 # Import HRA Nodes
 from interpreter import RightMemoryNode, RightInstructionNode, LeftMemoryNode, LeftInstructionNode, MoveMemoryNode, \
     MoveInstructionNode, MoveMemoryValueNode, PrintNode, FunctionNode, CloseNode, CallNode, ExitNode, GreaterNode, \
-    LessNode, EqualNode, UnequalNode, SetNode, IncrementNode, DecrementNode, MultiplyNode, BaseNode
-from interpreter import system
+    LessNode, EqualNode, UnequalNode, SetNode, IncrementNode, DecrementNode, MultiplyNode, BaseNode, SuperBaseNode, \
+    ShiftMemoryNode, ArithmeticNode
+from interpreter import system, entryPoints, pointerRanges
 
 
 # outputReader :: bytes -> str
@@ -21,6 +24,16 @@ def outputReader(output: bytes) -> str:
     ))
 
 
+# inputWriter :: List[int] -> bytes
+def inputWriter(memory_input: List[int]) -> bytes:
+    """
+    Used for converting the inputs to the words a program compiled with runtime input reads from stdin
+    :param memory_input: Values of the first memory cells
+    :return: Input for the compiled program
+    """
+    return b''.join(map(lambda value: wrapWord(value).to_bytes(4, 'little'), memory_input))
+
+
 # makeComment :: str -> str
 def makeComment(comment: str) -> str:
     """
@@ -49,7 +62,7 @@ def makeIndicator(label: str, *arguments: str) -> str:
     :param arguments: Arguments for the label
     :return: Indicator string for in assembly
     """
-    return f"{label}".ljust(9) + f"{' '.join(arguments)}\n"
+    return (f"{label}".ljust(9) + f"{' '.join(arguments)}").rstrip() + '\n'
 
 
 # makeInstruction :: str -> Tuple[str] -> str
@@ -63,23 +76,15 @@ def makeInstruction(instruction: str, *arguments: str) -> str:
     return f"\t{instruction.upper()}".ljust(6) + f"{', '.join(arguments)}\n"
 
 
-# compileNodes :: List[BaseNode] -> Dict[str, Any] -> int -> bool -> str
-def compileNodes(nodes: List[BaseNode],
-                 compilerDefaults: Dict[str, Any],
-                 node_index: Optional[int] = 0,
-                 verbose: Optional[bool] = True) -> str:
+# nodeLabels :: BaseNode -> Dict[str, Any] -> bool -> str
+def nodeLabels(node: BaseNode, compilerDefaults: Dict[str, Any], verbose: Optional[bool] = True) -> str:
     """
-    Function for compiling the given nodes with compilerDefaults
-    :param nodes: Nodes to compile
+    Function for generating the labels (and verbose comment) in front of the instructions of a node
+    :param node: Node to compile
     :param compilerDefaults: Dictionary with settings for compiler
-    :param node_index: Index of compiled node (internal only)
     :param verbose: Extra verbose assembly
-    :return: Assembly string with all the compiled nodes
+    :return: Assembly string with the labels of the node
     """
-    if node_index >= len(nodes):
-        return ''
-    node = nodes[node_index]
-
     to_add_str = ''
     # Add extra verbose message inside assembly
     if verbose:
@@ -89,7 +94,35 @@ def compileNodes(nodes: List[BaseNode],
     if compilerDefaults['node_start'] == node.row:
         to_add_str += makeLabel(compilerDefaults['start_branch'])
 
-    to_add_str += makeLabel(f'node_{node.row}')
+    return to_add_str + makeLabel(f'node_{node.row}')
+
+
+# compileNode :: BaseNode -> int -> Dict[str, Any] -> bool -> str
+def compileNode(node: BaseNode,
+                nodes_amount: int,
+                compilerDefaults: Dict[str, Any],
+                verbose: Optional[bool] = True) -> str:
+    """
+    Function for compiling a single node with compilerDefaults
+    :param node: Node to compile
+    :param nodes_amount: Amount of nodes in the program
+    :param compilerDefaults: Dictionary with settings for compiler
+    :param verbose: Extra verbose assembly
+    :return: Assembly string of the node
+    """
+    return nodeLabels(node, compilerDefaults, verbose) + nodeInstructions(node, nodes_amount, compilerDefaults)
+
+
+# nodeInstructions :: BaseNode -> int -> Dict[str, Any] -> str
+def nodeInstructions(node: BaseNode, nodes_amount: int, compilerDefaults: Dict[str, Any]) -> str:
+    """
+    Function for generating the instructions of a single node with compilerDefaults
+    :param node: Node to compile
+    :param nodes_amount: Amount of nodes in the program
+    :param compilerDefaults: Dictionary with settings for compiler
+    :return: Assembly string with the instructions of the node
+    """
+    to_add_str = ''
 
     # Memory manipulations
     if isinstance(node, RightMemoryNode):
@@ -123,6 +156,21 @@ def compileNodes(nodes: List[BaseNode],
         to_add_str += makeInstruction('mov', 'r0', f'#{node.change_value}')
         to_add_str += makeInstruction('str', 'r0', f'[{compilerDefaults["mempointer"]}]')
 
+    # Superinstructions of the optimizer
+    # The fused constants can be any 32 bit value, so they are not always a valid immediate
+    elif isinstance(node, ShiftMemoryNode):
+        if node.pointer_pos is not None:
+            to_add_str += makeInstruction('mov', compilerDefaults['mempointer'], 'fp')
+            to_add_str += addConstant(compilerDefaults['mempointer'], compilerDefaults['scratch'],
+                                      -(node.pointer_pos + 1) * compilerDefaults['alignment'])
+        else:
+            to_add_str += addConstant(compilerDefaults['mempointer'], compilerDefaults['scratch'],
+                                      -node.move_amount * compilerDefaults['alignment'])
+
+    elif isinstance(node, ArithmeticNode):
+        to_add_str += applyArithmetic('r0', node.multiplier, node.change_value, False, compilerDefaults)
+        to_add_str += makeInstruction('str', 'r0', f'[{compilerDefaults["mempointer"]}]')
+
     # Value manipulation
     elif isinstance(node, (IncrementNode, DecrementNode, MultiplyNode)):
         if isinstance(node, IncrementNode):
@@ -145,9 +193,9 @@ def compileNodes(nodes: List[BaseNode],
         else:
             branch_index = node.pointer_pos
 
-        if branch_index < 0 or len(nodes) < branch_index:
+        if branch_index < 0 or nodes_amount < branch_index:
             raise SyntaxError(f'At row {node.row}: Goto statement to node {branch_index} does not exist, '
-                              f'max available {len(nodes)}')
+                              f'max available {nodes_amount}')
 
         to_add_str += makeInstruction('b', f'node_{branch_index}')
 
@@ -170,8 +218,6 @@ def compileNodes(nodes: List[BaseNode],
 
     # Printing
     elif isinstance(node, PrintNode):
-        to_add_str += makeInstruction('mov', 'r1', 'r4')
-        to_add_str += makeInstruction('mov', 'r2', f'#{compilerDefaults["alignment"]}')
         to_add_str += makeInstruction('bl', compilerDefaults['print_branch'])
 
     # Comparing of values
@@ -192,69 +238,443 @@ def compileNodes(nodes: List[BaseNode],
         to_add_str += makeInstruction(branch_condition, f'node_{node.row + 1}')
         to_add_str += makeInstruction('b', f'node_{node.row + 2}')
 
-    return to_add_str + compileNodes(nodes, compilerDefaults, node_index + 1, verbose)
+    return to_add_str
+
 
+# Nodes that only change the value of the current memory cell
+arithmeticNodes = (SetNode, IncrementNode, DecrementNode, MultiplyNode, ArithmeticNode)
 
-# memoryFiller :: List[int] -> int -> int -> str
-def memoryFiller(input_mem: List[int], alignment: int, index: int = None) -> str:
+
+@dataclass
+class cell_cache:
     """
-    Function for generating the filling of storage when given the argument -i [values]
-    :param input_mem: All the integer inputs
-    :param alignment: Alignment in assembly file
-    :param index: Index of the input
-    :return: Assembly string with an input generator
+    State of the register which caches the current memory cell while compiling a basic block.
+    Arithmetic on the cell is folded into value * multiplier + change_value until the register is needed.
+    """
+    # The register holds the value of the current memory cell
+    loaded: bool = field(default=False)
+    # The register holds a value that has not been stored in the memory cell yet
+    dirty: bool = field(default=False)
+
+    multiplier: int = field(default=1)
+    change_value: int = field(default=0)
+
+    # Index of the current memory cell when the memory pointer is known within the basic block
+    cell: Optional[int] = field(default=None)
+
+
+# wrapWord :: int -> int
+def wrapWord(value: int) -> int:
+    """
+    Wrap the value around to an unsigned 32 bit word like the registers do
+    :param value: Value to wrap
+    :return: Wrapped value
     """
-    if not input_mem:
+    return value & 0xFFFFFFFF
+
+
+# armImmediate :: int -> bool
+def armImmediate(value: int) -> bool:
+    """
+    Check if the value fits in an ARM immediate, which is an 8 bit value rotated right by an even amount
+    :param value: Unsigned 32 bit value
+    :return: True if the value can be used as immediate
+    """
+    return any(map(lambda rotation: ((value << rotation | value >> (32 - rotation)) & 0xFFFFFFFF) < 256,
+                   range(0, 32, 2)))
+
+
+# loadConstant :: str -> int -> str
+def loadConstant(register: str, value: int) -> str:
+    """
+    Function for loading any 32 bit constant in a register without a literal pool
+    :param register: Register to load the constant in
+    :param value: Constant
+    :return: Assembly string with the instructions
+    """
+    value = wrapWord(value)
+    if armImmediate(value):
+        return makeInstruction('mov', register, f'#{value}')
+    if armImmediate(value ^ 0xFFFFFFFF):
+        return makeInstruction('mvn', register, f'#{value ^ 0xFFFFFFFF}')
+
+    # Build the value byte by byte, every byte is a valid immediate on its own
+    parts = list(filter(lambda part: part, map(lambda shift: value & (0xFF << shift), range(0, 32, 8))))
+    return makeInstruction('mov', register, f'#{parts[0]}') + \
+        ''.join(map(lambda part: makeInstruction('orr', register, f'#{part}'), parts[1:]))
+
+
+# addConstant :: str -> str -> int -> str
+def addConstant(register: str, scratch: str, value: int) -> str:
+    """
+    Function for adding any 32 bit constant to a register, the scratch register is only used when neither the
+    constant nor its negation fits in an immediate
+    :param register: Register to add the constant to
+    :param scratch: Register which may be overwritten
+    :param value: Constant
+    :return: Assembly string with the instructions
+    """
+    value = wrapWord(value)
+    if armImmediate(value):
+        return makeInstruction('add', register, f'#{value}') if value else ''
+    if armImmediate(wrapWord(-value)):
+        return makeInstruction('sub', register, f'#{wrapWord(-value)}')
+    return loadConstant(scratch, value) + makeInstruction('add', register, scratch)
+
+
+# applyArithmetic :: str -> int -> int -> bool -> Dict[str, Any] -> str
+def applyArithmetic(register: str, multiplier: int, change_value: int, loaded: bool,
+                    compilerDefaults: Dict[str, Any]) -> str:
+    """
+    Function for setting a register to the current memory cell * multiplier + change_value
+    :param register: Register for the result
+    :param multiplier: Multiplier of the cell
+    :param change_value: Value added after the multiplication
+    :param loaded: The register already holds the current memory cell
+    :param compilerDefaults: Dictionary with settings for compiler
+    :return: Assembly string with the arithmetic instructions
+    """
+    scratch = compilerDefaults['scratch']
+    multiplier, change_value = wrapWord(multiplier), wrapWord(change_value)
+    if multiplier == 0:
+        return loadConstant(register, change_value)
+
+    to_add_str = ''
+    if not loaded:
+        to_add_str += makeInstruction('ldr', register, f'[{compilerDefaults["mempointer"]}]')
+    if multiplier != 1:
+        to_add_str += loadConstant(scratch, multiplier)
+        to_add_str += makeInstruction('mul', register, scratch, register)
+    return to_add_str + addConstant(register, scratch, change_value)
+
+
+# flushArithmetic :: cell_cache -> Dict[str, Any] -> str
+def flushArithmetic(cache: cell_cache, compilerDefaults: Dict[str, Any]) -> str:
+    """
+    Function for applying the folded arithmetic to the register of the current memory cell
+    :param cache: State of the register
+    :param compilerDefaults: Dictionary with settings for compiler
+    :return: Assembly string with the arithmetic instructions
+    """
+    if wrapWord(cache.multiplier) == 1 and wrapWord(cache.change_value) == 0:
         return ''
-    if index is None:
-        index = 1
 
-    value, *rest = input_mem
-    to_add_str = makeInstruction('mov', 'r0', f'#{value}')
-    to_add_str += makeInstruction('str', 'r0', f'[fp, #-{index * alignment}]')
+    to_add_str = applyArithmetic(compilerDefaults['cellcache'], cache.multiplier, cache.change_value, cache.loaded,
+                                 compilerDefaults)
+    cache.loaded, cache.dirty = True, True
+    cache.multiplier, cache.change_value = 1, 0
+    return to_add_str
 
-    return to_add_str + memoryFiller(rest, alignment, index + 1)
 
+# spillCell :: cell_cache -> Dict[str, Any] -> bool -> str
+def spillCell(cache: cell_cache, compilerDefaults: Dict[str, Any], forget: bool) -> str:
+    """
+    Function for storing the register of the current memory cell in the memory when it has changed
+    :param cache: State of the register
+    :param compilerDefaults: Dictionary with settings for compiler
+    :param forget: The register does not hold the current memory cell anymore afterwards
+    :return: Assembly string with the store
+    """
+    to_add_str = flushArithmetic(cache, compilerDefaults)
+    if cache.dirty:
+        to_add_str += makeInstruction('str', compilerDefaults['cellcache'], f'[{compilerDefaults["mempointer"]}]')
 
-# compiler :: List[BaseNode] -> system -> str -> List[int] -> Dict[str, Any] -> str
-def compiler(nodes: List[BaseNode], sys: system, link_name: str, input_mem: List[int], **kwargs) -> str:
+    cache.dirty = False
+    cache.loaded = cache.loaded and not forget
+    return to_add_str
+
+
+# foldArithmetic :: BaseNode -> cell_cache -> None
+def foldArithmetic(node: BaseNode, cache: cell_cache) -> None:
+    """
+    Fold the arithmetic of the node into the arithmetic of the register
+    :param node: Node which only changes the value of the current memory cell
+    :param cache: State of the register
+    """
+    if isinstance(node, SetNode):
+        multiplier, change_value = 0, node.change_value
+    elif isinstance(node, IncrementNode):
+        multiplier, change_value = 1, node.change_value
+    elif isinstance(node, DecrementNode):
+        multiplier, change_value = 1, -node.change_value
+    elif isinstance(node, MultiplyNode):
+        multiplier, change_value = node.change_value, 0
+    else:
+        multiplier, change_value = node.multiplier, node.change_value
+
+    cache.multiplier = wrapWord(cache.multiplier * multiplier)
+    cache.change_value = wrapWord(cache.change_value * multiplier + change_value)
+
+
+# nextCell :: BaseNode -> Optional[int] -> Optional[int]
+def nextCell(node: BaseNode, cell: Optional[int]) -> Optional[int]:
+    """
+    Get the index of the current memory cell after the node has moved the memory pointer
+    :param node: Node which moves the memory pointer
+    :param cell: Index of the current memory cell before the node, None when unknown
+    :return: Index of the current memory cell after the node, None when unknown
+    """
+    if isinstance(node, MoveMemoryNode) or isinstance(node, ShiftMemoryNode) and node.pointer_pos is not None:
+        return node.pointer_pos
+    if cell is None:
+        return None
+    if isinstance(node, RightMemoryNode):
+        return cell + node.move_amount
+    if isinstance(node, LeftMemoryNode):
+        return cell - node.move_amount
+    return cell + node.move_amount
+
+
+# compareCached :: BaseNode -> Dict[str, Any] -> cell_cache -> str
+def compareCached(node: BaseNode, compilerDefaults: Dict[str, Any], cache: cell_cache) -> str:
+    """
+    Function for compiling a compare, the register is used for the cell it caches instead of loading it again
+    :param node: Compare node
+    :param compilerDefaults: Dictionary with settings for compiler
+    :param cache: State of the register
+    :return: Assembly string of the compare
+    """
+    to_add_str = flushArithmetic(cache, compilerDefaults)
+
+    # Without a known memory pointer one of the compared cells can be the cached cell
+    if cache.cell is None:
+        to_add_str += spillCell(cache, compilerDefaults, forget=True)
+
+    registers = []
+    for register, index in (('r0', node.lhs), ('r1', node.rhs)):
+        if cache.loaded and cache.cell == index:
+            registers.append(compilerDefaults['cellcache'])
+        else:
+            to_add_str += makeInstruction('ldr', register, f'[fp, #-{(index + 1) * compilerDefaults["alignment"]}]')
+            registers.append(register)
+    to_add_str += makeInstruction('cmp', *registers)
+
+    if isinstance(node, GreaterNode):
+        branch_condition = 'BGT'
+    elif isinstance(node, LessNode):
+        branch_condition = 'BLT'
+    elif isinstance(node, EqualNode):
+        branch_condition = 'BEQ'
+    else:
+        branch_condition = 'BNE'
+
+    # Both next nodes start a basic block, a store does not change the flags of the compare
+    to_add_str += spillCell(cache, compilerDefaults, forget=True)
+    to_add_str += makeInstruction(branch_condition, f'node_{node.row + 1}')
+    return to_add_str + makeInstruction('b', f'node_{node.row + 2}')
+
+
+# compileCachedNode :: BaseNode -> int -> Dict[str, Any] -> cell_cache -> bool -> Tuple[int, int] -> bool -> str
+def compileCachedNode(node: BaseNode,
+                      nodes_amount: int,
+                      compilerDefaults: Dict[str, Any],
+                      cache: cell_cache,
+                      entry: bool,
+                      pointer: Optional[Tuple[int, int]],
+                      verbose: Optional[bool] = True) -> str:
+    """
+    Function for compiling a single node while the current memory cell is kept in a register.
+    The register is only stored at the end of a basic block, before a call, show memory or compare.
+    :param node: Node to compile
+    :param nodes_amount: Amount of nodes in the program
+    :param compilerDefaults: Dictionary with settings for compiler
+    :param cache: State of the register
+    :param entry: The node can be jumped to, so it starts a basic block
+    :param pointer: Lowest and highest memory pointer before the node found by the bounds analysis
+    :param verbose: Extra verbose assembly
+    :return: Assembly string of the node
+    """
+    # Every path to a label must have the memory up to date
+    to_add_str = ''
+    if entry or isinstance(node, (FunctionNode, CloseNode)):
+        to_add_str += spillCell(cache, compilerDefaults, forget=True)
+        cache.cell = pointer[0] if pointer is not None and pointer[0] == pointer[1] else None
+    to_add_str += nodeLabels(node, compilerDefaults, verbose)
+
+    if isinstance(node, arithmeticNodes):
+        foldArithmetic(node, cache)
+        return to_add_str
+
+    if isinstance(node, MoveMemoryValueNode):
+        to_add_str += flushArithmetic(cache, compilerDefaults)
+        if not cache.loaded:
+            to_add_str += makeInstruction('ldr', compilerDefaults['cellcache'], f'[{compilerDefaults["mempointer"]}]')
+            cache.loaded = True
+        move_adres = (node.pointer_pos + 1) * compilerDefaults['alignment']
+        return to_add_str + makeInstruction('str', compilerDefaults['cellcache'], f'[fp, #-{move_adres}]')
+
+    if isinstance(node, (GreaterNode, LessNode, EqualNode, UnequalNode)):
+        to_add_str += compareCached(node, compilerDefaults, cache)
+        cache.cell = None
+        return to_add_str
+
+    # The print reads the cell from the memory but keeps the register intact, the other nodes move the
+    # memory pointer or leave the basic block
+    to_add_str += spillCell(cache, compilerDefaults, forget=not isinstance(node, PrintNode))
+    if isinstance(node, (RightMemoryNode, LeftMemoryNode, MoveMemoryNode, ShiftMemoryNode)):
+        cache.cell = nextCell(node, cache.cell)
+    elif not isinstance(node, PrintNode):
+        cache.cell = None
+    return to_add_str + nodeInstructions(node, nodes_amount, compilerDefaults)
+
+
+# compileNodes :: List[BaseNode] -> Dict[str, Any] -> TextIO -> bool -> bool -> Dict[int, Tuple[int, int]] -> None
+def compileNodes(nodes: List[BaseNode],
+                 compilerDefaults: Dict[str, Any],
+                 writer: TextIO,
+                 verbose: Optional[bool] = True,
+                 optimize: Optional[bool] = False,
+                 pointers: Optional[Dict[int, Tuple[int, int]]] = None) -> None:
+    """
+    Function for compiling the given nodes with compilerDefaults, the assembly is written node by node
+    :param nodes: Nodes to compile
+    :param compilerDefaults: Dictionary with settings for compiler
+    :param writer: File or buffer the assembly is written to
+    :param verbose: Extra verbose assembly
+    :param optimize: Keep the current memory cell in a register within basic blocks
+    :param pointers: Memory pointer ranges of the reachable nodes, used to find the cached cell when optimizing
+    """
+    if pointers is None:
+        pointers = {}
+    entries = entryPoints(nodes)
+    cache = cell_cache()
+
+    node_index = 0
+    while node_index < len(nodes):
+        node = nodes[node_index]
+        if optimize:
+            writer.write(compileCachedNode(node, len(nodes), compilerDefaults, cache, node_index in entries,
+                                           pointers.get(node_index), verbose))
+        else:
+            writer.write(compileNode(node, len(nodes), compilerDefaults, verbose))
+
+        # Nodes which are fused into a superinstruction are never jumped to and are skipped
+        node_index += len(node.fused) if isinstance(node, SuperBaseNode) else 1
+
+    # Store the register when the program runs past the last node
+    if optimize:
+        writer.write(spillCell(cache, compilerDefaults, forget=True))
+
+
+# memoryImage :: List[int] -> Dict[str, Any] -> TextIO -> None
+def memoryImage(input_mem: List[int], compilerDefaults: Dict[str, Any], writer: TextIO) -> None:
     """
-    Main compiler function
+    Function for generating the initial memory as data, given with the argument -i [values].
+    Memory cells are addressed downwards from the memory top, so the image is stored in reverse.
+    :param input_mem: All the integer inputs
+    :param compilerDefaults: Dictionary with settings for compiler
+    :param writer: File or buffer the assembly is written to
+    """
+    alignment = compilerDefaults['alignment']
+    writer.write(makeIndicator('.section', '.data'))
+    writer.write(makeIndicator('.align', str(alignment)))
+    writer.write(makeLabel(compilerDefaults['memory_bottom']))
+
+    empty_cells = compilerDefaults['memory_size'] - len(input_mem)
+    if empty_cells:
+        writer.write(makeIndicator('.space', str(empty_cells * alignment)))
+
+    values = list(map(lambda value: str(wrapWord(value)), reversed(input_mem)))
+    for index in range(0, len(values), 8):
+        writer.write(makeIndicator('.word', ', '.join(values[index:index + 8])))
+    writer.write(makeLabel(compilerDefaults['memory_top']))
+
+
+# writeAssembly :: List[BaseNode] -> system -> str -> List[int] -> TextIO -> bool -> Dict[str, Any] -> None
+def writeAssembly(nodes: List[BaseNode], sys: system, link_name: str, input_mem: List[int], writer: TextIO,
+                  runtime_input: bool = False, **kwargs) -> None:
+    """
+    Main compiler function, the assembly is written to the writer while the nodes are compiled
     :param nodes: Nodes in the HRA file
     :param sys: Prepared system which has variables that the compiler uses
     :param link_name: Main function name
-    :param input_mem: All inputs given from the user
+    :param input_mem: All inputs given from the user, these are not used with runtime input
+    :param writer: File or buffer the assembly is written to
+    :param runtime_input: Read the first memory cells from stdin when the program starts instead of storing the
+        inputs in the program, so the same program can run every input
     :param kwargs: Kwargs for the internal compileNodes function
-    :return: Assembly string of the file
     """
     compilerDefaults = {
         # Label names
         'exit_branch': '_exit',
         'print_branch': 'show_memory',
+        'flush_branch': 'flush_output',
+        'read_branch': 'read_input',
+        'memory_bottom': '_memory_bottom',
+        'memory_top': '_memory_top',
         'start_branch': link_name,
         'node_start': sys.instruction_pointer + 1,
 
         # Register definitions
         'stack_top': 'sp',
         'mempointer': 'r4',
+        'cellcache': 'r5',
+        'scratch': 'r1',
         'stack_bottom': 'fp',
+        'output_pointer': 'r6',
+        'output_end': 'r8',
 
         # Qemu settings
+        'kernel_read': '#0x3',
         'kernel_print': '#0x4',
         'kernel_exit': '#0x1',
 
         # Compiler settings
         'alignment': 4,
         'memory_size': len(sys.memory),
+        'output_size': 4096,
     }
 
+    # Printed words are added to the output buffer, which is only written when it is full and at the exit
     print_func = ''.join([
         makeLabel(compilerDefaults["print_branch"]),
-        makeInstruction('push', '{r0, r7, lr}'),
+        makeInstruction('push', '{r0, lr}'),
+        makeInstruction('ldr', 'r0', f'[{compilerDefaults["mempointer"]}]'),
+        makeInstruction('str', 'r0', f'[{compilerDefaults["output_pointer"]}]'),
+        makeInstruction('add', compilerDefaults['output_pointer'], f'#{compilerDefaults["alignment"]}'),
+        makeInstruction('cmp', compilerDefaults['output_pointer'], compilerDefaults['output_end']),
+        makeInstruction('bleq', compilerDefaults['flush_branch']),
+        makeInstruction('pop', '{r0, pc}')
+    ])
+
+    flush_func = ''.join([
+        makeLabel(compilerDefaults["flush_branch"]),
+        makeInstruction('push', '{r0, r1, r2, r7, lr}'),
+        makeInstruction('sub', 'r1', compilerDefaults['output_end'], f'#{compilerDefaults["output_size"]}'),
+        makeInstruction('sub', 'r2', compilerDefaults['output_pointer'], 'r1'),
         makeInstruction('mov', 'r0', '#1'),
         makeInstruction('mov', 'r7', compilerDefaults['kernel_print']),
         makeInstruction('swi', '0'),
-        makeInstruction('pop', '{r0, r7, pc}')
+        makeInstruction('mov', compilerDefaults['output_pointer'], 'r1'),
+        makeInstruction('pop', '{r0, r1, r2, r7, pc}')
+    ])
+
+    # Every input word is read to its memory cell until stdin ends or the memory is full
+    read_func = ''.join([
+        makeLabel(compilerDefaults['read_branch']),
+        makeInstruction('push', '{r0, r1, r2, r3, r7, lr}'),
+        makeInstruction('mov', 'r1', compilerDefaults['mempointer']),
+        loadConstant('r3', compilerDefaults['memory_size']),
+        makeInstruction('mov', 'r7', compilerDefaults['kernel_read']),
+        makeLabel('read_word'),
+        makeInstruction('cmp', 'r3', '#0'),
+        makeInstruction('beq', 'read_done'),
+        makeInstruction('mov', 'r2', f'#{compilerDefaults["alignment"]}'),
+        # A read can return less bytes than requested, the rest of the word is read again
+        makeLabel('read_bytes'),
+        makeInstruction('mov', 'r0', '#0'),
+        makeInstruction('swi', '0'),
+        makeInstruction('cmp', 'r0', '#0'),
+        makeInstruction('ble', 'read_done'),
+        makeInstruction('add', 'r1', 'r0'),
+        makeInstruction('subs', 'r2', 'r0'),
+        makeInstruction('bne', 'read_bytes'),
+        # Cells are addressed downwards, so go back over the read word and the next cell
+        makeInstruction('sub', 'r1', f'#{compilerDefaults["alignment"] * 2}'),
+        makeInstruction('sub', 'r3', '#1'),
+        makeInstruction('b', 'read_word'),
+        makeLabel('read_done'),
+        makeInstruction('pop', '{r0, r1, r2, r3, r7, pc}')
     ])
 
     init = ''.join([
@@ -264,33 +684,54 @@ def compiler(nodes: List[BaseNode], sys: system, link_name: str, input_mem: List
         '\n'
     ])
 
-    if input_mem:
-        input_instructions = ''.join([
-            makeLabel('_input'),
-            memoryFiller(input_mem, compilerDefaults['alignment']),
-            makeLabel('_start_final')
-        ])
-    else:
-        input_instructions = ''
-
     start = ''.join([
         makeLabel('_start'),
-        makeInstruction('mov', 'fp', 'sp'),
-        makeInstruction('mov', 'r4', 'sp'),
+        makeInstruction('ldr', 'fp', f'={compilerDefaults["memory_top"]}'),
+        makeInstruction('mov', 'r4', 'fp'),
         makeInstruction('sub', 'r4', f'#{compilerDefaults["alignment"]}'),
-        makeInstruction('sub', 'sp', f'#{compilerDefaults["memory_size"] * compilerDefaults["alignment"]}'),
-        input_instructions,
-        makeInstruction('b', link_name)
+        makeInstruction('mov', compilerDefaults['output_end'], 'sp'),
+        makeInstruction('sub', 'sp', f'#{compilerDefaults["output_size"]}'),
+        makeInstruction('mov', compilerDefaults['output_pointer'], 'sp')
     ])
 
     exit_func = ''.join([
         makeLabel(compilerDefaults['exit_branch']),
-        makeInstruction('mov', 'sp', 'fp'),
+        makeInstruction('bl', compilerDefaults['flush_branch']),
         makeInstruction('mov', 'r7', compilerDefaults['kernel_exit']),
         makeInstruction('mov', 'r0', '#1'),
         makeInstruction('swi', '0')
     ])
 
-    inside = compileNodes(nodes, compilerDefaults, **kwargs)
+    writer.write(init)
+    writer.write(start)
+    if runtime_input:
+        writer.write(makeInstruction('bl', compilerDefaults['read_branch']))
+    writer.write(makeInstruction('b', link_name))
+    if runtime_input:
+        writer.write('\n' + read_func)
+    # The address of the memory top is placed right after the start, so it is always in range of the ldr
+    writer.write(makeIndicator('.ltorg'))
+    writer.write(exit_func + '\n' + print_func + '\n' + flush_func + '\n')
+
+    if kwargs.get('optimize'):
+        kwargs['pointers'] = pointerRanges(nodes, sys)
+    compileNodes(nodes, compilerDefaults, writer, **kwargs)
 
-    return init + start + exit_func + '\n' + print_func + '\n' + inside
+    writer.write('\n')
+    memoryImage([] if runtime_input else input_mem, compilerDefaults, writer)
+
+
+# compiler :: List[BaseNode] -> system -> str -> List[int] -> Dict[str, Any] -> str
+def compiler(nodes: List[BaseNode], sys: system, link_name: str, input_mem: List[int], **kwargs) -> str:
+    """
+    Compile the nodes to a single assembly string
+    :param nodes: Nodes in the HRA file
+    :param sys: Prepared system which has variables that the compiler uses
+    :param link_name: Main function name
+    :param input_mem: All inputs given from the user
+    :param kwargs: Kwargs for the internal compileNodes function
+    :return: Assembly string of the file
+    """
+    buffer = StringIO()
+    writeAssembly(nodes, sys, link_name, input_mem, buffer, **kwargs)
+    return buffer.getvalue()
@@ -0,0 +1,125 @@
+# Libraries
+import os
+import shutil
+import hashlib
+import tempfile
+import subprocess
+from functools import lru_cache
+from typing import List, Tuple, Optional
+
+# HRA files
+from interpreter.cache import cacheDirectory
+
+# Commands of the ARM toolchain that assembles, links and runs the compiled programs
+assemblerCommand = 'arm-linux-gnueabi-as'
+linkerCommand = 'arm-linux-gnueabi-gcc-9'
+emulatorCommand = 'qemu-arm'
+
+# Flags of the linker, these are part of the key of a cached executable
+linkerFlags = ['-nostdlib']
+
+
+# toolchainAvailable :: None -> bool
+def toolchainAvailable() -> bool:
+    """
+    Check if all commands of the toolchain can be found
+    :return: True if compiled programs can be built and run
+    """
+    return all(map(shutil.which, [assemblerCommand, linkerCommand, emulatorCommand]))
+
+
+# toolVersion :: str -> bytes
+@lru_cache(maxsize=None)
+def toolVersion(command: str) -> bytes:
+    """
+    Get the version of a command of the toolchain, a build made by another version is not reused
+    :param command: Command of the toolchain
+    :return: Version output of the command
+    """
+    try:
+        return subprocess.run([command, '--version'], capture_output=True).stdout
+    except OSError:
+        return b''
+
+
+# buildKey :: List[bytes] -> str
+def buildKey(parts: List[bytes]) -> str:
+    """
+    Get the name of a cached build from everything the build depends on
+    :param parts: Inputs of the build
+    :return: Hash of the inputs
+    """
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(len(part).to_bytes(8, 'little') + part)
+    return digest.hexdigest()
+
+
+# runTool :: List[str] -> str -> None
+def runTool(arguments: List[str], action: str) -> None:
+    """
+    Run a command of the toolchain
+    :param arguments: Command and its arguments
+    :param action: Description of the command for the error
+    """
+    status = subprocess.run(arguments, capture_output=True)
+    if status.returncode:
+        raise RuntimeError(f"{action} failed:\n{status.stderr.decode()}")
+
+
+# buildProgram :: str -> bool -> Optional[str] -> Tuple[str, bool]
+def buildProgram(asm_filename: str, use_cache: bool = True, cache_directory: Optional[str] = None) -> Tuple[str, bool]:
+    """
+    Assemble and link the assembly of the compiler to an executable. Objects and executables are cached by the hash
+    of the assembly and the versions of the toolchain, a cached executable skips the assembler and the linker.
+    Every build is made in its own temporary directory, so builds can run at the same time.
+    :param asm_filename: Location of the assembly
+    :param use_cache: Read and write the build cache, without it the executable is placed next to the assembly
+    :param cache_directory: Location of the build cache, defaults to the cache directory next to the assembly
+    :return: Location of the executable and whether it was taken from the cache
+    """
+    if cache_directory is None:
+        cache_directory = os.path.join(os.path.dirname(os.path.abspath(asm_filename)), cacheDirectory)
+
+    with open(asm_filename, 'rb') as file:
+        object_key = buildKey([toolVersion(assemblerCommand), file.read()])
+    elf_key = buildKey([toolVersion(linkerCommand), ' '.join(linkerFlags).encode(), object_key.encode()])
+
+    cached_o_filename = os.path.join(cache_directory, object_key + '.o')
+    cached_elf_filename = os.path.join(cache_directory, elf_key + '.elf')
+    if use_cache and os.path.isfile(cached_elf_filename):
+        return cached_elf_filename, True
+
+    elf_filename = cached_elf_filename if use_cache else os.path.splitext(os.path.abspath(asm_filename))[0] + '.elf'
+    os.makedirs(os.path.dirname(elf_filename), exist_ok=True)
+
+    # The temporary directory is on the same file system as the result, so the files can be moved at once
+    with tempfile.TemporaryDirectory(dir=os.path.dirname(elf_filename)) as directory:
+        o_filename = cached_o_filename
+        if not use_cache or not os.path.isfile(cached_o_filename):
+            # Compile the assembly to an object file
+            o_filename = os.path.join(directory, 'program.o')
+            runTool([assemblerCommand, asm_filename, '-o', o_filename], f"Assembling {asm_filename}")
+            if use_cache:
+                os.replace(o_filename, cached_o_filename)
+                o_filename = cached_o_filename
+
+        # Compile the object file to an executable
+        built_filename = os.path.join(directory, 'program.elf')
+        runTool([linkerCommand, o_filename, '-o', built_filename, *linkerFlags], f"Linking {asm_filename}")
+        os.replace(built_filename, elf_filename)
+
+    return elf_filename, False
+
+
+# runProgram :: str -> bytes -> Tuple[bytes, int]
+def runProgram(elf_filename: str, input_data: bytes = b'') -> Tuple[bytes, int]:
+    """
+    Run the executable in the emulator
+    :param elf_filename: Location of the executable
+    :param input_data: Data for stdin, used by programs compiled with runtime input
+    :return: Raw output and return code of the program
+    """
+    run_status = subprocess.run([emulatorCommand, os.path.abspath(elf_filename)], input=input_data,
+                                stdout=subprocess.PIPE)
+    return run_status.stdout, run_status.returncode
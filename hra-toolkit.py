@@ -1,18 +1,23 @@
 # Libraries
 import os
+import json
+import signal
 import argparse
-import subprocess
+from dataclasses import replace
 
 # HRA Files
-from interpreter import prepare_interpreter, runner
-from compiler import compiler, outputReader
+from interpreter import prepare_interpreter, tracer, emptyTrace, recordStates, linker, accelerator, machine, jit, \
+    clearCache, batch, readInputs, profile, profiler, limits
+from interpreter.server import serve, defaultPort, defaultCacheSize
+from interpreter.checkpoint import checkpoints, programHash, readCheckpoint, restoreCheckpoint, requestCheckpoint
+from compiler import writeAssembly, outputReader, inputWriter, buildProgram, runProgram
 
 if __name__ == '__main__':
     cli_parser = argparse.ArgumentParser(description='CLI for the HRA toolkit')
     required = cli_parser.add_argument_group('required arguments')
-    required.add_argument('-f', '--file', type=str, required=True,
-                          help='Location of the file')
-    required.add_argument('-m', '--memsize', default=32,
+    required.add_argument('-f', '--file', type=str, default=None,
+                          help='Location of the file, not needed for the server')
+    required.add_argument('-m', '--memsize', type=int, default=32,
                           metavar='SIZE', help='Allocate the size of the memory')
 
     select = cli_parser.add_mutually_exclusive_group(required=True)
@@ -20,6 +25,8 @@ if __name__ == '__main__':
                         help='Run the interpreter on given file')
     select.add_argument('-c', '--compiler', action='store_true',
                         help='Run the compiler on given file')
+    select.add_argument('-sv', '--serve', type=int, nargs='?', const=defaultPort, default=None, metavar='PORT',
+                        help='Run programs for HTTP/JSON requests on the local port')
 
     optional = cli_parser.add_argument_group('optional arguments')
     optional.add_argument('-s', '--state', type=str, choices=['final', 'all', 'none'], default='none',
@@ -32,32 +39,156 @@ if __name__ == '__main__':
                           help='Run a HRA compiled program')
     optional.add_argument('-va', '--verboseAssembly', action='store_true',
                           help='Gives extra information in the assembly file')
+    optional.add_argument('-oa', '--optimizeAssembly', action='store_true',
+                          help='Keep the current memory cell in a register to save loads and stores')
+    optional.add_argument('-ri', '--runtimeInput', action='store_true',
+                          help='Compile a program that reads its inputs from stdin, so it runs every input')
     optional.add_argument('-so', '--silentOutput', action='store_true',
                           help='Gives only the output from HRA interpreter or compiler')
+    optional.add_argument('-j', '--jit', action='store_true',
+                          help='Translate the program to python before interpreting it')
+    optional.add_argument('-op', '--optimize', action='store_true',
+                          help='Fuse runs of nodes into superinstructions before running or compiling, the '
+                               'interpreter also fast-forwards counted loops')
+    optional.add_argument('-ws', '--wordSize', type=int, choices=[32, 64], default=0,
+                          help='Store the memory in cells of the given amount of bits which wrap around on overflow')
+    optional.add_argument('-nc', '--noCache', action='store_true',
+                          help='Do not read or write the cache of parsed programs and builds')
+    optional.add_argument('-cc', '--clearCache', action='store_true',
+                          help='Remove the cache of parsed programs and builds next to the file before running')
+    optional.add_argument('-ms', '--maxSteps', type=int, default=None, metavar='STEPS',
+                          help='Stop the interpreter after the given amount of steps, every executed node or '
+                               'superinstruction is a step')
+    optional.add_argument('-to', '--timeout', type=float, default=None, metavar='SECONDS',
+                          help='Stop the interpreter when the run takes longer than the given amount of seconds')
+    optional.add_argument('-cd', '--cycleDetection', type=int, nargs='?', const=256, default=None,
+                          metavar='INTERVAL',
+                          help='Stop the interpreter when a state repeats, the state is sampled every INTERVAL steps '
+                               'or at the first jump or compare after them')
+    optional.add_argument('-pr', '--profile', type=str, nargs='?', const='', default=None, metavar='PATH',
+                          help='Profile the interpreter and print the hot spots, or write them as JSON to the path')
+    optional.add_argument('-if', '--inputsFile', type=str, default=None, metavar='PATH',
+                          help='Run the interpreter once for every input vector in the file, one vector per line')
+    optional.add_argument('-w', '--workers', type=int, default=None,
+                          help='Amount of processes that run the inputs file or the requests, defaults to all cpus')
+    optional.add_argument('-cs', '--cacheSize', type=int, default=defaultCacheSize, metavar='PROGRAMS',
+                          help='Amount of linked programs every worker of the server keeps in its cache')
+    optional.add_argument('-cp', '--checkpoint', type=str, default=None, metavar='PATH',
+                          help='Write the state of the interpreter to the path when it is terminated')
+    optional.add_argument('-ci', '--checkpointInterval', type=int, default=None, metavar='STEPS',
+                          help='Also write the checkpoint every given amount of steps')
+    optional.add_argument('-rs', '--resume', type=str, default=None, metavar='PATH',
+                          help='Continue the interpreter from the checkpoint at the path instead of the start')
 
     # Execute the parse_args() method
     args = vars(cli_parser.parse_args())
 
+    run_limits = limits(args.get('maxSteps'), args.get('timeout'), args.get('cycleDetection'))
+
+    if args.get('serve') is not None:
+        # The requests give their own programs, the limits are the defaults of every run
+        print(f"Serving HRA on http://127.0.0.1:{args.get('serve')}")
+        serve(args.get('serve'), args.get('cacheSize'), args.get('workers'), run_limits)
+        raise SystemExit
+
+    if args.get('file') is None:
+        cli_parser.error('the following arguments are required: -f/--file')
+
+    if args.get('clearCache'):
+        clearCache(args.get('file'))
+
+    uses_checkpoint = args.get('checkpoint') is not None or args.get('resume') is not None
+    if uses_checkpoint and (not args.get('interpreter') or args.get('inputsFile') is not None):
+        cli_parser.error('checkpoints can only be used by a single run of the interpreter')
+    if args.get('checkpointInterval') is not None and args.get('checkpoint') is None:
+        cli_parser.error('the checkpoint interval needs a checkpoint path')
+
+    if args.get('inputsFile') is not None:
+        if not args.get('interpreter'):
+            cli_parser.error('the inputs file can only be run by the interpreter')
+        if args.get('state') == 'all':
+            cli_parser.error('the inputs file only keeps the final state of every run, use -s final')
+
+        # Parse the program once and print the results of every input in order
+        for result in batch(
+            filename=args.get('file'),
+            memory_size=args.get('memsize'),
+            inputs=readInputs(args.get('inputsFile')),
+            optimize=args.get('optimize'),
+            word_size=args.get('wordSize'),
+            use_jit=args.get('jit'),
+            processes=args.get('workers'),
+            use_cache=not args.get('noCache'),
+            run_limits=run_limits
+        ):
+            if result.error is not None:
+                print(result.output + f'\nError: {result.error}')
+            elif args.get('silentOutput'):
+                print(result.output)
+            elif args.get('state') == 'none':
+                print(result.output + f'\nExited with code: 1')
+            else:
+                print(result.output, result.state, f'\nExited with code: 1', sep='\n')
+        raise SystemExit
+
+    # A resumed run gets the memory size and word size of its checkpoint
+    saved = readCheckpoint(args.get('resume')) if args.get('resume') is not None else None
+
     # Get the nodes from the interpreter
     nodes, prepared_system = prepare_interpreter(
         filename=args.get('file'),
-        memory_size=args.get('memsize'),
-        memory_input=args.get('input')
+        memory_size=args.get('memsize') if saved is None else len(saved.memory),
+        memory_input=args.get('input') if saved is None else [],
+        optimize=args.get('optimize'),
+        word_size=args.get('wordSize') if saved is None else saved.word_size,
+        use_cache=not args.get('noCache')
     )
 
+    if uses_checkpoint:
+        program_hash = programHash(args.get('file'))
+        if saved is not None:
+            restoreCheckpoint(saved, prepared_system, program_hash, len(nodes))
+            run_limits = replace(run_limits, start_steps=saved.steps)
+        if args.get('checkpoint') is not None:
+            run_limits = replace(run_limits, checkpoint=checkpoints(args.get('checkpoint'), program_hash,
+                                                                    args.get('checkpointInterval')))
+            signal.signal(signal.SIGTERM, requestCheckpoint)
+
     # Get interpreter
     if args.get('interpreter'):
-        states = runner(nodes, prepared_system)
-
-        if not args.get('silentOutput'):
-            # Print state
-            if args.get('state') == 'all':
-                print(*states, sep='\n')
+        if args.get('profile') is not None:
+            # writeProfile :: profile -> None
+            def writeProfile(run_profile: profile) -> None:
+                if args.get('profile'):
+                    with open(args.get('profile'), 'w') as file:
+                        json.dump(run_profile.toDict(), file, indent=4)
+                else:
+                    print('\n\n' + run_profile.report())
+
+            # Run the nodes one by one and measure every node, a run that stops with an error still gets its profile
+            run_profile = profiler(nodes, prepared_system, run_limits, writeProfile)
+
+            if args.get('state') == 'final' and not args.get('silentOutput'):
+                print(prepared_system)
+            writeProfile(run_profile)
+        elif args.get('state') == 'all' and not args.get('silentOutput'):
+            # Record the run as a delta trace and print every state as soon as it has been recorded
+            for state in recordStates(nodes, prepared_system, emptyTrace(prepared_system), run_limits):
+                print(state)
+        elif args.get('state') == 'final' and not args.get('silentOutput'):
+            # The trace only keeps the changes of every step, the final state is rebuilt from its last keyframe
+            recording = tracer(nodes, prepared_system, run_limits=run_limits)
+            print(recording[-1] if len(recording) else prepared_system)
+        else:
+            # Run the linked program, after the run the system holds the final state
+            linked = linker(nodes, prepared_system)
+            if args.get('optimize'):
+                linked = accelerator(linked)
 
-            elif args.get('state') == 'final':
-                *_, final_state = states
-                print(final_state)
+            engine = jit if args.get('jit') else machine
+            engine(linked, prepared_system, run_limits)
 
+        if not args.get('silentOutput'):
             print(f'\nExited with code: 1')
         else:
             print()
@@ -70,18 +201,28 @@ if __name__ == '__main__':
         else:
             output_filename = args.get('output')
 
-        compiled_file = compiler(
-            nodes,
-            prepared_system,
-            os.path.split(output_filename)[-1],
-            args.get('input'),
-            verbose=args.get('verboseAssembly')
-        )
+        link_name = os.path.split(output_filename)[-1]
         output_filename += '.asm'
-
-        # Write the output file
-        with open(output_filename, 'w') as file:
-            file.write(compiled_file)
+        temporary_filename = output_filename + '.tmp'
+
+        # Write the assembly while compiling, the output file is only replaced when the compiler has succeeded
+        with open(temporary_filename, 'w') as file:
+            try:
+                writeAssembly(
+                    nodes,
+                    prepared_system,
+                    link_name,
+                    args.get('input'),
+                    file,
+                    runtime_input=args.get('runtimeInput'),
+                    verbose=args.get('verboseAssembly'),
+                    optimize=args.get('optimizeAssembly')
+                )
+            except BaseException:
+                file.close()
+                os.remove(temporary_filename)
+                raise
+        os.replace(temporary_filename, output_filename)
 
         if not args.get('silentOutput'):
             print(f'Compiled HRA content to {output_filename}')
@@ -90,32 +231,14 @@ if __name__ == '__main__':
             if not args.get('silentOutput'):
                 print(f'Running the compiled program...\n')
 
-            run_filename = output_filename
-            base_filename = os.path.splitext(run_filename)[0]
-            o_filename = base_filename + '.o'
-            elf_filename = base_filename + '.elf'
-
-            # Compile the assembly to an object file
-            o_status = subprocess.run(
-                ['arm-linux-gnueabi-as', run_filename, '-o', o_filename],
-                stdout=subprocess.PIPE
-            )
-            # Compile the object file to an executable
-            elf_status = subprocess.run(
-                ['arm-linux-gnueabi-gcc-9', o_filename, '-o', elf_filename, '-nostdlib'],
-                stdout=subprocess.PIPE
-            )
-            # Remove the object file
-            rm_o_status = subprocess.run(
-                ['rm', o_filename],
-                stdout=subprocess.PIPE
-            )
-            # Run the executable
-            run_status = subprocess.run(
-                ['qemu-arm', f'./{elf_filename}'],
-                stdout=subprocess.PIPE
-            )
-
-            print(outputReader(run_status.stdout))
+            # Assemble, link and run the compiled program
+            elf_filename, cache_hit = buildProgram(output_filename, use_cache=not args.get('noCache'))
+            if not args.get('silentOutput') and not args.get('noCache'):
+                print(f'Build cache {"hit" if cache_hit else "miss"}: {elf_filename}\n')
+
+            input_data = inputWriter(args.get('input')) if args.get('runtimeInput') else b''
+            output, returncode = runProgram(elf_filename, input_data)
+
+            print(outputReader(output))
             if not args.get('silentOutput'):
-                print(f'Exited with code: {run_status.returncode}', sep='\n')
+                print(f'Exited with code: {returncode}', sep='\n')
@@ -1,8 +1,21 @@
 from .nodes import RightMemoryNode, RightInstructionNode, LeftMemoryNode, LeftInstructionNode, MoveMemoryNode, \
     MoveInstructionNode, MoveMemoryValueNode, PrintNode, FunctionNode, CloseNode, CallNode, ExitNode, GreaterNode, \
-    LessNode, EqualNode, UnequalNode, SetNode, IncrementNode, DecrementNode, MultiplyNode, BaseNode
+    LessNode, EqualNode, UnequalNode, SetNode, IncrementNode, DecrementNode, MultiplyNode, BaseNode, SuperBaseNode, \
+    ShiftMemoryNode, ArithmeticNode
 
 from .interpreter import prepare_interpreter
-from .runner import runner
+from .cache import loadNodes, clearCache
+from .runner import runner, execute, stream
+from .asyncrunner import runAsync
+from .trace import trace, tracer, emptyTrace, recordStates
+from .profiler import profile, profiler
 from .system import system
+from .optimizer import optimizer, entryPoints
+from .bounds import analyseBounds, pointerRanges
+from .linker import linker, program, opcodes
+from .limits import limits
+from .loops import accelerator
+from .machine import machine
+from .jit import jit
+from .batch import batch, readInputs, run_result
 
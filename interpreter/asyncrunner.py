@@ -0,0 +1,45 @@
+# Libraries
+import asyncio
+from itertools import islice
+from contextlib import redirect_stdout, nullcontext
+from typing import List, TextIO, Optional
+
+# HRA files
+from .nodes import BaseNode
+from .system import system
+from .runner import execute
+from .limits import limits
+
+# Default amount of steps a run executes before it gives the event loop to the other tasks
+yieldInterval = 1024
+
+
+# runAsync :: List[BaseNode] -> system -> Optional[limits] -> int -> Optional[TextIO] -> system
+async def runAsync(AST_tree: List[BaseNode], sys: system, run_limits: Optional[limits] = None,
+                   yield_interval: int = yieldInterval, output: Optional[TextIO] = None) -> system:
+    """
+    Run the AST_Tree on the virtual system as a coroutine. The run yields to the event loop after every
+    yield_interval steps, every waiting run gets its turn before this run continues, so many runs share one event
+    loop fairly. Cancelling the task stops the run at its next yield.
+    :param AST_tree: Nodes to execute
+    :param sys: Virtual system
+    :param run_limits: Limits of the run, the max steps are the step budget of the run. The timeout is wall time,
+        which includes the time the run waits for other tasks.
+    :param yield_interval: Amount of steps between two yields, at least 1
+    :param output: Stream the printed output of this run is written to, defaults to stdout
+    :return: The system after running the program
+    """
+    if yield_interval < 1:
+        raise ValueError(f"The yield interval has to be at least 1 step, not {yield_interval}")
+
+    performed = execute(AST_tree, sys, run_limits)
+    try:
+        while True:
+            # Only this run executes until the next yield, so its output can be redirected for the whole slice
+            with redirect_stdout(output) if output is not None else nullcontext():
+                steps = sum(1 for _ in islice(performed, yield_interval))
+            if steps < yield_interval:
+                return sys
+            await asyncio.sleep(0)
+    finally:
+        performed.close()
@@ -0,0 +1,211 @@
+# Libraries
+import io
+import time
+from sys import byteorder
+from array import array
+from copy import copy
+from contextlib import redirect_stdout
+from dataclasses import dataclass, field
+from multiprocessing import Pool
+from typing import List, Iterator, Optional, Tuple, Callable
+
+# HRA files
+from .interpreter import prepare_interpreter
+from .system import system
+from .linker import linker, program
+from .machine import machine
+from .jit import jit, jitCompile
+from .nodes import BaseNode
+from .limits import limits
+from .loops import accelerator
+
+
+@dataclass
+class run_result:
+    """
+    Result of running the program on a single input vector
+    """
+    index: int
+    memory_input: List[int]
+    output: str = field(default='')
+    state: Optional[system] = field(default=None, repr=False)
+    error: Optional[str] = field(default=None)
+
+    # Time the run took in seconds
+    duration: float = field(default=0.0, repr=False)
+
+
+# Program of the batch in this (worker) process, set once by loadBatch. It holds the linked program, the prepared
+# system, the limits of every run and the function the jit compiled the program to, which is None for the machine.
+batchProgram: Optional[Tuple[program, system, Optional[limits], Optional[Callable]]] = None
+
+
+# First bytes of a binary inputs file
+inputsMagic = b'HRAI'
+
+
+# readBinaryInputs :: bytes -> List[List[int]]
+def readBinaryInputs(content: bytes) -> List[List[int]]:
+    """
+    Read the input vectors of a binary inputs file, after the magic every vector is stored as its length in
+    4 bytes followed by its values in 8 bytes each, all little endian
+    :param content: Content of the inputs file
+    :return: All input vectors in order
+    """
+    inputs = []
+    position = len(inputsMagic)
+    while position < len(content):
+        length = int.from_bytes(content[position:position + 4], 'little')
+        position += 4
+        values = array('q', content[position:position + length * 8])
+        if len(values) != length:
+            raise RuntimeError(f"Binary inputs file ends inside vector {len(inputs) + 1}")
+        if byteorder == 'big':
+            values.byteswap()
+        inputs.append(values.tolist())
+        position += length * 8
+    return inputs
+
+
+# readInputs :: str -> List[List[int]]
+def readInputs(filename: str) -> List[List[int]]:
+    """
+    Read the input vectors of a batch. A text file holds the inputs of one run per line separated by spaces,
+    empty lines are runs without input and lines starting with ~ are comments. A file starting with the
+    inputs magic is read as a binary inputs file.
+    :param filename: Location of the inputs file
+    :return: All input vectors in order
+    """
+    with open(filename, 'rb') as file:
+        content = file.read()
+    if content.startswith(inputsMagic):
+        return readBinaryInputs(content)
+
+    return list(map(lambda line: list(map(int, line.split())),
+                    filter(lambda line: not line.lstrip().startswith('~'), content.decode().splitlines())))
+
+
+# cloneSystem :: system -> List[int] -> system
+def cloneSystem(template: system, memory_input: List[int]) -> system:
+    """
+    Make a fresh system for a run from the system which is prepared by makeAST, only the memory is new
+    :param template: Prepared system without input
+    :param memory_input: Input of the run
+    :return: System with the given input
+    """
+    fresh = copy(template)
+    fresh.memory = system(len(template.memory), memory_input, template.word_size).memory
+    return fresh
+
+
+# loadProgram :: program -> system -> bool -> Optional[limits] -> Optional[Callable] -> None
+def loadProgram(linked: program, template: system, use_jit: bool, run_limits: Optional[limits],
+                compiled: Optional[Callable] = None) -> None:
+    """
+    Set the program of the runs in this process, the jit compiles it once for all runs
+    :param linked: Program made by the linker
+    :param template: Prepared system without input
+    :param use_jit: Run the program with the jit instead of the machine
+    :param run_limits: Limits of every run
+    :param compiled: Function the jit already compiled the program to, guarded when there are limits
+    """
+    global batchProgram
+    if use_jit and compiled is None:
+        compiled = jitCompile(linked, template, bool(run_limits))
+    batchProgram = (linked, template, run_limits, compiled if use_jit else None)
+
+
+# loadBatch :: List[BaseNode] -> system -> bool -> Optional[limits] -> bool -> None
+def loadBatch(nodes: List[BaseNode], template: system, use_jit: bool, run_limits: Optional[limits] = None,
+              accelerate: bool = False) -> None:
+    """
+    Link the program once for every run in this process
+    :param nodes: Nodes which are prepared by makeAST
+    :param template: Prepared system without input
+    :param use_jit: Run the program with the jit instead of the machine
+    :param run_limits: Limits of every run
+    :param accelerate: Fast-forward the counted loops of the program
+    """
+    linked = linker(nodes, template)
+    loadProgram(accelerator(linked) if accelerate else linked, template, use_jit, run_limits)
+
+
+# runInput :: Tuple[int, List[int]] -> run_result
+def runInput(job: Tuple[int, List[int]]) -> run_result:
+    """
+    Run the loaded program on a single input vector, the printed output is captured in the result
+    :param job: Index and input vector of the run
+    :return: Result of the run
+    """
+    index, memory_input = job
+    linked, template, run_limits, compiled = batchProgram
+    result = run_result(index, memory_input)
+
+    output = io.StringIO()
+    start = time.perf_counter()
+    try:
+        sys = cloneSystem(template, memory_input)
+        with redirect_stdout(output):
+            if compiled is None:
+                machine(linked, sys, run_limits)
+            else:
+                jit(linked, sys, run_limits, compiled)
+        result.state = sys
+    except RuntimeError as error:
+        result.error = str(error)
+
+    result.duration = time.perf_counter() - start
+    result.output = output.getvalue()
+    return result
+
+
+# runLoaded :: List[List[int]] -> bool -> List[run_result]
+def runLoaded(inputs: List[List[int]], keep_state: bool) -> List[run_result]:
+    """
+    Run the loaded program on input vectors in this process, for workers that get another program for every job
+    :param inputs: Input vectors
+    :param keep_state: Keep the final states in the results
+    :return: Results in the order of the inputs
+    """
+    results = list(map(runInput, enumerate(inputs)))
+    if not keep_state:
+        for result in results:
+            result.state = None
+    return results
+
+
+# batch :: str -> int -> List[List[int]] -> bool -> int -> bool -> Optional[int] -> int -> bool -> Optional[limits]
+#          -> Iterator[run_result]
+def batch(filename: str, memory_size: int, inputs: List[List[int]], optimize: bool = False, word_size: int = 0,
+          use_jit: bool = False, processes: Optional[int] = None, chunk_size: int = 16,
+          use_cache: bool = True, run_limits: Optional[limits] = None) -> Iterator[run_result]:
+    """
+    Run the same program on many input vectors. The program is parsed and linked once and every run gets a
+    fresh system, the runs are spread over a pool of processes.
+    :param filename: Location of the program
+    :param memory_size: Size of the memory of every run
+    :param inputs: Input vectors, one per run
+    :param optimize: Fuse runs of nodes into superinstructions and fast-forward counted loops
+    :param word_size: Size of a memory cell in bits, 0 for unbounded
+    :param use_jit: Run the program with the jit instead of the machine
+    :param processes: Amount of worker processes, None uses all cpus and 1 runs in this process
+    :param chunk_size: Amount of runs that are sent to a worker at once
+    :param use_cache: Read and write the cache of parsed programs
+    :param run_limits: Limits of every run, a run that exceeds them gets an error as result
+    :return: Results in the order of the inputs, every result is returned as soon as it and the ones before it are done
+    """
+    nodes, template = prepare_interpreter(filename, memory_size, [], optimize, word_size, use_cache)
+
+    # Check every input before running anything
+    for memory_input in inputs:
+        if len(memory_input) > memory_size:
+            raise RuntimeError('Requested memory size is smaller than the given input')
+
+    jobs = enumerate(inputs)
+    if processes == 1:
+        loadBatch(nodes, template, use_jit, run_limits, optimize)
+        yield from map(runInput, jobs)
+        return
+
+    with Pool(processes, initializer=loadBatch, initargs=(nodes, template, use_jit, run_limits, optimize)) as pool:
+        yield from pool.imap(runInput, jobs, chunk_size)
@@ -0,0 +1,222 @@
+# Libraries
+from copy import copy
+from typing import List, Tuple, Dict, Set, Optional
+
+# HRA files
+from .nodes import RightMemoryNode, LeftMemoryNode, MoveMemoryNode, MoveMemoryValueNode, CallNode, ExitNode, \
+    GreaterNode, LessNode, EqualNode, UnequalNode, BaseNode, SuperBaseNode, ShiftMemoryNode
+from .linker import nodeTarget
+from .system import system, check_range
+
+# Amount of times a node is visited before its memory pointer range is widened to the whole memory
+widenAfter = 3
+
+
+# nextIndexes :: List[BaseNode] -> int -> system -> List[int]
+def nextIndexes(nodes: List[BaseNode], index: int, sys: system) -> List[int]:
+    """
+    Get the instruction pointers the runner can continue at after the given node
+    :param nodes: Nodes of the program
+    :param index: Index of the node, negative when the node runs at its negative index like in the runner
+    :param sys: System with the registered functions
+    :return: Indexes of the next nodes, these can be outside the program. Empty when the node ends the run.
+    """
+    node = nodes[index]
+    if isinstance(node, ExitNode) or isinstance(node, CallNode) and node.func_name not in sys.functions:
+        targets = []
+    elif isinstance(node, (GreaterNode, LessNode, EqualNode, UnequalNode)):
+        targets = [index + 1, index + 2]
+    elif isinstance(node, SuperBaseNode):
+        targets = [index + len(node.fused)]
+    elif (target := nodeTarget(node, index, sys)) is not None:
+        targets = [target]
+    else:
+        targets = [index + 1]
+    return targets
+
+
+# successors :: List[BaseNode] -> int -> system -> List[int]
+def successors(nodes: List[BaseNode], index: int, sys: system) -> List[int]:
+    """
+    Get the indexes of the nodes that can be executed after the given node
+    :param nodes: Nodes of the program
+    :param index: Index of the node, negative when the node runs at its negative index like in the runner
+    :param sys: System with the registered functions
+    :return: Indexes of the next nodes which are inside the program, a node after a negative index can be negative
+    """
+    # Negative indexes are kept like the runner keeps them, the runner counts up from there to the first node
+    return list(filter(lambda target: -len(nodes) <= target < len(nodes), nextIndexes(nodes, index, sys)))
+
+
+# shiftPointer :: BaseNode -> Tuple[int, int] -> int -> Tuple[int, int]
+def shiftPointer(node: BaseNode, pointer: Tuple[int, int], memory_size: int) -> Tuple[int, int]:
+    """
+    Get the range of the memory pointer after the node has been performed, when the node moves the
+    memory pointer outside the memory it raises an error so the range is always inside the memory
+    :param node: Node which is performed
+    :param pointer: Lowest and highest memory pointer before the node
+    :param memory_size: Size of the memory
+    :return: Lowest and highest memory pointer after the node
+    """
+    low, high = pointer
+    if isinstance(node, (MoveMemoryNode, ShiftMemoryNode)) and node.pointer_pos is not None:
+        low = high = node.pointer_pos
+    elif isinstance(node, (RightMemoryNode, LeftMemoryNode, ShiftMemoryNode)):
+        move_amount = -node.move_amount if isinstance(node, LeftMemoryNode) else node.move_amount
+        low, high = low + move_amount, high + move_amount
+    return max(low, 0), min(high, memory_size - 1)
+
+
+# pointerRanges :: List[BaseNode] -> system -> Dict[int, Tuple[int, int]]
+def pointerRanges(nodes: List[BaseNode], sys: system) -> Dict[int, Tuple[int, int]]:
+    """
+    Find the range of the memory pointer before every reachable node by following all paths through the program
+    :param nodes: Nodes which are prepared by makeAST
+    :param sys: System which is prepared by makeAST
+    :return: Lowest and highest memory pointer of every reachable node index, a node that is reached at its
+        negative index has its own range there
+    """
+    memory_size = len(sys.memory)
+    ranges: Dict[int, Tuple[int, int]] = {}
+    visits: Dict[int, int] = {}
+
+    worklist = [(sys.instruction_pointer, (sys.memory_pointer, sys.memory_pointer))]
+    while worklist:
+        index, (low, high) = worklist.pop()
+        if not -len(nodes) <= index < len(nodes):
+            continue
+
+        if index in ranges:
+            old_low, old_high = ranges[index]
+            low, high = min(low, old_low), max(high, old_high)
+            if (low, high) == (old_low, old_high):
+                continue
+
+            # Stop following loops that keep moving the memory pointer
+            visits[index] = visits.get(index, 0) + 1
+            if visits[index] >= widenAfter:
+                low = 0 if low < old_low else low
+                high = memory_size - 1 if high > old_high else high
+
+        ranges[index] = (low, high)
+        after = shiftPointer(nodes[index], (low, high), memory_size)
+        if after[0] > after[1]:
+            # The node always raises an error
+            continue
+        worklist.extend(map(lambda target: (target, after), successors(nodes, index, sys)))
+
+    return ranges
+
+
+# needsCheck :: BaseNode -> Tuple[int, int] -> int -> bool
+def needsCheck(node: BaseNode, pointer: Tuple[int, int], memory_size: int) -> bool:
+    """
+    Check if the memory pointer can leave the memory by performing the node
+    :param node: Node which moves the memory pointer relative to its current position
+    :param pointer: Lowest and highest memory pointer before the node
+    :param memory_size: Size of the memory
+    :return: True if the node still has to check the range while running
+    """
+    low, high = pointer
+    if isinstance(node, ShiftMemoryNode):
+        absolute_inside = node.absolute_low is None or 0 <= node.absolute_low and node.absolute_high < memory_size
+        return not (absolute_inside and 0 <= low + node.low and high + node.high < memory_size)
+
+    move_amount = -node.move_amount if isinstance(node, LeftMemoryNode) else node.move_amount
+    return not (0 <= low + move_amount and high + move_amount < memory_size)
+
+
+# constantAccesses :: BaseNode -> Optional[List[int]]
+def constantAccesses(node: BaseNode) -> Optional[List[int]]:
+    """
+    Get the memory indexes a node accesses that do not depend on the memory pointer
+    :param node: Node of the program
+    :return: Accessed memory indexes, None when the node has no constant accesses
+    """
+    if isinstance(node, (MoveMemoryNode, MoveMemoryValueNode)):
+        return [node.pointer_pos]
+    if isinstance(node, (GreaterNode, LessNode, EqualNode, UnequalNode)):
+        return [node.lhs, node.rhs]
+    return None
+
+
+# runsOnEveryPath :: List[BaseNode] -> int -> Set[int] -> system -> bool
+def runsOnEveryPath(nodes: List[BaseNode], index: int, stops: Set[int], sys: system) -> bool:
+    """
+    Check if every run of the program executes the node. A run avoids the node when it can end, leave the program,
+    loop forever or stop at one of the stops before it reaches the node.
+    :param nodes: Nodes which are prepared by makeAST
+    :param index: Index of the node
+    :param stops: Indexes of the other nodes which can raise an error while running
+    :param sys: System which is prepared by makeAST
+    :return: True if no path from the start avoids the node
+    """
+    # Depth first search over the paths that avoid the node, a path that comes back to one of its nodes is a loop
+    path: Set[int] = set()
+    finished: Set[int] = set()
+    worklist = [(sys.instruction_pointer, False)]
+    while worklist:
+        current, leaving = worklist.pop()
+        if leaving:
+            path.remove(current)
+            finished.add(current)
+            continue
+        if not -len(nodes) <= current < len(nodes) or current in path:
+            return False
+        if current % len(nodes) == index or current in finished:
+            continue
+
+        targets = nextIndexes(nodes, current, sys)
+        if not targets or current % len(nodes) in stops:
+            return False
+        path.add(current)
+        worklist.append((current, True))
+        worklist.extend(map(lambda target: (target, False), targets))
+    return True
+
+
+# analyseBounds :: List[BaseNode] -> system -> List[BaseNode]
+def analyseBounds(nodes: List[BaseNode], sys: system) -> List[BaseNode]:
+    """
+    Check all memory accesses of the reachable nodes before running the program. A constant access outside the
+    memory raises an error right away when every run executes it, otherwise it is checked when a run gets there.
+    Nodes that can never access outside the memory do not check it while running.
+    :param nodes: Nodes which are prepared by makeAST
+    :param sys: System which is prepared by makeAST
+    :return: Nodes where the proven nodes are replaced with copies that have range_checked disabled
+    """
+    memory_size = len(sys.memory)
+    analysed = list(nodes)
+
+    # A node that runs at both of its indexes has to be proven for both ranges
+    pointers: Dict[int, Tuple[int, int]] = {}
+    for index, (low, high) in pointerRanges(nodes, sys).items():
+        index %= len(nodes)
+        old_low, old_high = pointers.get(index, (low, high))
+        pointers[index] = (min(low, old_low), max(high, old_high))
+
+    # outside :: int -> bool
+    def outside(index: int) -> bool:
+        accesses = constantAccesses(nodes[index])
+        return accesses is not None and not all(map(lambda access: 0 <= access < memory_size, accesses))
+
+    # Nodes that can raise an error while running, a run that stops there does not reach the nodes after it
+    stops = set(filter(lambda index: outside(index) or isinstance(
+        nodes[index], (RightMemoryNode, LeftMemoryNode, ShiftMemoryNode)) and needsCheck(
+        nodes[index], pointers[index], memory_size), pointers))
+
+    for index, pointer in pointers.items():
+        node = nodes[index]
+        if outside(index):
+            if runsOnEveryPath(nodes, index, stops - {index}, sys):
+                check_range(constantAccesses(node), sys, node)
+            continue
+        elif constantAccesses(node) is None and (not isinstance(
+                node, (RightMemoryNode, LeftMemoryNode, ShiftMemoryNode)) or needsCheck(node, pointer, memory_size)):
+            continue
+
+        proven = copy(node)
+        proven.range_checked = False
+        analysed[index] = proven
+
+    return analysed
@@ -0,0 +1,132 @@
+# Libraries
+import os
+import pickle
+import shutil
+import hashlib
+import tempfile
+from copy import copy
+from typing import List, Union
+
+# HRA files
+from .lexer import lexer
+from .parser import parser
+from .nodes import BaseNode
+
+# Name of the cache directory which is placed next to the programs
+cacheDirectory = '__hracache__'
+
+# Version of the nodes in the cache, increase it whenever the lexer, parser or nodes change
+cacheVersion = 1
+
+# First bytes of every cache file
+cacheMagic = b'HRAC'
+
+
+# cachePath :: str -> str
+def cachePath(filename: str) -> str:
+    """
+    Get the location of the cache file of a program
+    :param filename: Location of the program
+    :return: Location of the cache file
+    """
+    directory, name = os.path.split(os.path.abspath(filename))
+    return os.path.join(directory, cacheDirectory, os.path.splitext(name)[0] + '.hrac')
+
+
+# cacheKey :: bytes -> bytes
+def cacheKey(file_content: bytes) -> bytes:
+    """
+    Get the header a cache file of the given program content must start with
+    :param file_content: Content of the program
+    :return: Magic, version and hash of the content
+    """
+    return cacheMagic + cacheVersion.to_bytes(4, 'little') + hashlib.sha256(file_content).digest()
+
+
+# readCache :: str -> bytes -> Union[List[BaseNode], None]
+def readCache(filename: str, key: bytes) -> Union[List[BaseNode], None]:
+    """
+    Read the parsed nodes from the cache
+    :param filename: Location of the program
+    :param key: Header of the current content of the program
+    :return: Parsed nodes or None when there is no valid cache of the current content
+    """
+    try:
+        with open(cachePath(filename), 'rb') as file:
+            if file.read(len(key)) != key:
+                return None
+            return pickle.load(file)
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError, ValueError):
+        return None
+
+
+# compactNode :: BaseNode -> BaseNode
+def compactNode(node: BaseNode) -> BaseNode:
+    """
+    Copy the node without its parameter tokens, these are only needed while the node is made
+    :param node: Parsed node
+    :return: Node for in the cache
+    """
+    compact = copy(node)
+    compact.params = []
+    return compact
+
+
+# writeCache :: str -> bytes -> List[BaseNode] -> None
+def writeCache(filename: str, key: bytes, nodes: List[BaseNode]) -> None:
+    """
+    Write the parsed nodes to the cache, the file is replaced at once so a reader never sees a partial cache.
+    A cache that can not be written is skipped.
+    :param filename: Location of the program
+    :param key: Header of the content of the program
+    :param nodes: Parsed nodes
+    """
+    path = cachePath(filename)
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with tempfile.NamedTemporaryFile('wb', dir=os.path.dirname(path), delete=False) as file:
+            file.write(key)
+            pickle.dump(list(map(compactNode, nodes)), file, protocol=pickle.HIGHEST_PROTOCOL)
+        # Give the cache the same permissions as the program, like python does with its cache
+        os.chmod(file.name, os.stat(filename).st_mode & 0o666)
+    except OSError:
+        return
+
+    try:
+        os.replace(file.name, path)
+    except OSError:
+        os.remove(file.name)
+
+
+# clearCache :: str -> None
+def clearCache(filename: str) -> None:
+    """
+    Remove the cache directory of the directory of the given program
+    :param filename: Location of the program
+    """
+    shutil.rmtree(os.path.dirname(cachePath(filename)), ignore_errors=True)
+
+
+# loadNodes :: str -> bool -> List[BaseNode]
+def loadNodes(filename: str, use_cache: bool = True) -> List[BaseNode]:
+    """
+    Lex and parse the given program, or load the nodes from the cache when the program has not changed
+    :param filename: Location of the program
+    :param use_cache: Read and write the cache
+    :return: Parsed nodes
+    """
+    with open(filename, 'rb') as file:
+        file_content = file.read()
+
+    key = cacheKey(file_content)
+    if use_cache and (nodes := readCache(filename, key)) is not None:
+        return nodes
+
+    # Get the tokens
+    tokens = lexer(file_content.decode())
+    # Convert tokens to nodes
+    nodes = parser(tokens)
+
+    if use_cache:
+        writeCache(filename, key, nodes)
+    return nodes
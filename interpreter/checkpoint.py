@@ -0,0 +1,224 @@
+# Libraries
+import os
+import zlib
+import hashlib
+import tempfile
+import threading
+from sys import byteorder
+from array import array
+from dataclasses import dataclass, field
+from typing import List, Union, Optional
+
+# HRA files
+from .system import system, wordTypes
+
+# First bytes of every checkpoint file
+checkpointMagic = b'HRAS'
+
+# Version of the checkpoint format, increase it whenever the format changes
+checkpointVersion = 1
+
+# Set by requestCheckpoint, the next check of a run with checkpoints writes one and stops the run
+terminationRequest = threading.Event()
+
+
+@dataclass
+class checkpoints:
+    """
+    Settings of the checkpoints of a run, a checkpoint is always written when termination is requested
+    """
+    filename: str
+    program_hash: bytes = field(repr=False)
+
+    # Amount of steps between two checkpoints, None only writes a checkpoint on termination
+    interval: Optional[int] = field(default=None)
+
+
+@dataclass
+class checkpoint:
+    """
+    State of a run which can be continued later, the program hash makes sure it continues the same program
+    """
+    program_hash: bytes = field(repr=False)
+    steps: int
+
+    # Node index of the next node to execute
+    instruction_pointer: int
+    memory_pointer: int
+    word_size: int
+    memory: Union[List[int], array] = field(repr=False)
+
+
+# programHash :: str -> bytes
+def programHash(filename: str) -> bytes:
+    """
+    Get the hash of a program a checkpoint belongs to
+    :param filename: Location of the program
+    :return: Hash of the content of the program
+    """
+    with open(filename, 'rb') as file:
+        return hashlib.sha256(file.read()).digest()
+
+
+# requestCheckpoint :: None -> None
+def requestCheckpoint(*_) -> None:
+    """
+    Let the running program write a checkpoint and stop, this is the handler of SIGTERM
+    """
+    terminationRequest.set()
+
+
+# encodeCells :: Union[List[int], array] -> bytes
+def encodeCells(memory: Union[List[int], array]) -> bytes:
+    """
+    Encode unbounded cells as zigzag varints, so small values take a single byte
+    :param memory: Memory cells
+    :return: Encoded cells
+    """
+    encoded = bytearray()
+    for value in memory:
+        value = value << 1 if value >= 0 else (-value << 1) - 1
+        while value >= 0x80:
+            encoded.append(value & 0x7f | 0x80)
+            value >>= 7
+        encoded.append(value)
+    return bytes(encoded)
+
+
+# decodeCells :: bytes -> int -> List[int]
+def decodeCells(content: bytes, cells: int) -> List[int]:
+    """
+    Decode the zigzag varints of encodeCells
+    :param content: Encoded cells
+    :param cells: Amount of cells
+    :return: Memory cells
+    """
+    memory = []
+    value = shift = 0
+    for byte in content:
+        value |= (byte & 0x7f) << shift
+        shift += 7
+        if not byte & 0x80:
+            memory.append(value >> 1 if not value & 1 else -((value + 1) >> 1))
+            value = shift = 0
+    if len(memory) != cells or shift:
+        raise RuntimeError(f"Checkpoint holds {len(memory)} memory cells instead of {cells}")
+    return memory
+
+
+# checkpointBytes :: checkpoint -> bytes
+def checkpointBytes(saved: checkpoint) -> bytes:
+    """
+    Encode a checkpoint. After the magic and version follow the program hash, the steps, instruction pointer,
+    memory pointer, word size and amount of cells, all little endian. Cells of a fixed word size are stored as
+    they are in memory, unbounded cells as zigzag varints. A crc32 of everything before it ends the checkpoint.
+    :param saved: Checkpoint
+    :return: Encoded checkpoint
+    """
+    if saved.word_size:
+        cells = array(wordTypes[saved.word_size], saved.memory)
+        if byteorder == 'big':
+            cells.byteswap()
+        memory = cells.tobytes()
+    else:
+        memory = encodeCells(saved.memory)
+
+    content = checkpointMagic + checkpointVersion.to_bytes(4, 'little') + saved.program_hash + \
+        saved.steps.to_bytes(8, 'little') + saved.instruction_pointer.to_bytes(8, 'little', signed=True) + \
+        saved.memory_pointer.to_bytes(8, 'little', signed=True) + saved.word_size.to_bytes(1, 'little') + \
+        len(saved.memory).to_bytes(4, 'little') + memory
+    return content + zlib.crc32(content).to_bytes(4, 'little')
+
+
+# readCheckpointBytes :: bytes -> checkpoint
+def readCheckpointBytes(content: bytes) -> checkpoint:
+    """
+    Decode a checkpoint of checkpointBytes
+    :param content: Encoded checkpoint
+    :return: Checkpoint
+    """
+    header = len(checkpointMagic) + 4
+    if not content.startswith(checkpointMagic):
+        raise RuntimeError("File is not a checkpoint")
+    if int.from_bytes(content[len(checkpointMagic):header], 'little') != checkpointVersion:
+        raise RuntimeError(f"Checkpoint version is not supported, only version {checkpointVersion} can be read")
+    if len(content) < header + 65 or zlib.crc32(content[:-4]) != int.from_bytes(content[-4:], 'little'):
+        raise RuntimeError("Checkpoint is damaged")
+
+    # Fixed fields after the header: hash (32), steps (8), pointers (2 * 8), word size (1), cells (4)
+    fields = content[header:header + 61]
+    word_size, cells = fields[56], int.from_bytes(fields[57:61], 'little')
+    memory = content[header + 61:-4]
+    if word_size:
+        if word_size not in wordTypes:
+            raise RuntimeError(f"Checkpoint has an unsupported word size of {word_size} bits")
+        values = array(wordTypes[word_size], memory)
+        if byteorder == 'big':
+            values.byteswap()
+        if len(values) != cells:
+            raise RuntimeError(f"Checkpoint holds {len(values)} memory cells instead of {cells}")
+    else:
+        values = decodeCells(memory, cells)
+
+    return checkpoint(
+        program_hash=fields[:32],
+        steps=int.from_bytes(fields[32:40], 'little'),
+        instruction_pointer=int.from_bytes(fields[40:48], 'little', signed=True),
+        memory_pointer=int.from_bytes(fields[48:56], 'little', signed=True),
+        word_size=word_size,
+        memory=values
+    )
+
+
+# writeCheckpoint :: str -> checkpoint -> None
+def writeCheckpoint(filename: str, saved: checkpoint) -> None:
+    """
+    Write a checkpoint, the file is replaced at once so an interrupted write keeps the previous checkpoint
+    :param filename: Location of the checkpoint
+    :param saved: Checkpoint
+    """
+    directory = os.path.dirname(os.path.abspath(filename))
+    with tempfile.NamedTemporaryFile('wb', dir=directory, delete=False) as file:
+        file.write(checkpointBytes(saved))
+    os.replace(file.name, filename)
+
+
+# readCheckpoint :: str -> checkpoint
+def readCheckpoint(filename: str) -> checkpoint:
+    """
+    Read a checkpoint
+    :param filename: Location of the checkpoint
+    :return: Checkpoint
+    """
+    with open(filename, 'rb') as file:
+        return readCheckpointBytes(file.read())
+
+
+# restoreCheckpoint :: checkpoint -> system -> bytes -> int -> system
+def restoreCheckpoint(saved: checkpoint, sys: system, program_hash: bytes, nodes_amount: int) -> system:
+    """
+    Continue a run from a checkpoint on the system which is prepared for the same program
+    :param saved: Checkpoint
+    :param sys: Virtual system which is prepared by makeAST
+    :param program_hash: Hash of the program of the system
+    :param nodes_amount: Amount of nodes of the program, a negative instruction pointer counts from the end like the
+        runner indexes the nodes
+    :return: The system in the state of the checkpoint
+    """
+    if saved.program_hash != program_hash:
+        raise RuntimeError("Checkpoint belongs to another program")
+    if saved.word_size != sys.word_size:
+        raise RuntimeError(f"Checkpoint has a word size of {saved.word_size} bits instead of {sys.word_size}")
+    if len(saved.memory) != len(sys.memory):
+        raise RuntimeError(f"Checkpoint has a memory size of {len(saved.memory)} instead of {len(sys.memory)}")
+    if not 0 <= saved.memory_pointer < len(saved.memory):
+        raise RuntimeError(f"Checkpoint has a memory pointer of {saved.memory_pointer} outside the memory of "
+                           f"{len(saved.memory)} cells")
+    if not -nodes_amount <= saved.instruction_pointer < nodes_amount:
+        raise RuntimeError(f"Checkpoint has an instruction pointer of {saved.instruction_pointer} outside the program "
+                           f"of {nodes_amount} nodes")
+
+    sys.memory = saved.memory if saved.word_size else list(saved.memory)
+    sys.memory_pointer = saved.memory_pointer
+    sys.instruction_pointer = saved.instruction_pointer
+    return sys
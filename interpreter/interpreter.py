@@ -3,27 +3,42 @@ from typing import List, Tuple
 import os
 
 # HRA files
-from .lexer import lexer
-from .parser import parser
+from .cache import loadNodes
 from .system import system
+from .optimizer import optimizer
 from .runner import makeAST
+from .bounds import analyseBounds
 from .nodes import BaseNode
 
 
-# prepare_interpreter :: str -> int -> List[int] -> Tuple[List[BaseNode], system]
-def prepare_interpreter(filename: str, memory_size: int, memory_input: List[int]) -> Tuple[List[BaseNode], system]:
+# prepare_interpreter :: str -> int -> List[int] -> bool -> int -> bool -> Tuple[List[BaseNode], system]
+def prepare_interpreter(filename: str, memory_size: int, memory_input: List[int], optimize: bool = False,
+                        word_size: int = 0, use_cache: bool = True) -> Tuple[List[BaseNode], system]:
     if not os.path.isfile(filename):
         raise FileNotFoundError(f"Filename {filename} does not exist")
 
-    with open(filename, 'r') as file:
-        file_content = file.read()
+    # Get the parsed nodes, these are taken from the cache when the file has not changed
+    return prepareNodes(loadNodes(filename, use_cache), memory_size, memory_input, optimize, word_size)
 
-    # Get the tokens
-    tokens = lexer(file_content)
-    # Convert tokens to nodes
-    nodes = parser(tokens)
+
+# prepareNodes :: List[BaseNode] -> int -> List[int] -> bool -> int -> Tuple[List[BaseNode], system]
+def prepareNodes(nodes: List[BaseNode], memory_size: int, memory_input: List[int], optimize: bool = False,
+                 word_size: int = 0) -> Tuple[List[BaseNode], system]:
+    """
+    Prepare parsed nodes and their virtual system for running
+    :param nodes: Parsed nodes
+    :param memory_size: Size of the memory
+    :param memory_input: Values of the first memory cells
+    :param optimize: Fuse runs of nodes into superinstructions
+    :param word_size: Size of a memory cell in bits, 0 for unbounded
+    :return: Prepared nodes and system
+    """
+    # Fuse nodes into superinstructions
+    if optimize:
+        nodes = optimizer(nodes)
     # Make virtual system
-    sys = system(memory_size, memory_input)
+    sys = system(memory_size, memory_input, word_size)
     # Make AST_Tree
-    return makeAST(nodes, sys)
-
+    nodes, sys = makeAST(nodes, sys)
+    # Check the memory accesses before running
+    return analyseBounds(nodes, sys), sys
@@ -0,0 +1,217 @@
+# Libraries
+from typing import List, Callable, Dict, Any, Optional
+
+# HRA files
+from .linker import program, opcodes
+from .machine import stop, checkUpTo
+from .system import system, check_range
+from .limits import limits, guard, guardProgram
+from .loops import fastForward
+
+
+# Python operator of every compare instruction
+compareOperators = {
+    opcodes.GREATER: '>', opcodes.LESS: '<', opcodes.EQUAL: '==', opcodes.UNEQUAL: '!=',
+    opcodes.GUARD_GREATER: '>', opcodes.GUARD_LESS: '<', opcodes.GUARD_EQUAL: '==', opcodes.GUARD_UNEQUAL: '!='
+}
+
+
+# findLeaders :: program -> List[int]
+def findLeaders(linked: program) -> List[int]:
+    """
+    Find all instructions that start a basic block, these are the only values the instruction pointer can have
+    when the generated loop dispatches
+    :param linked: Program made by the linker
+    :return: Sorted instruction indexes of all leaders
+    """
+    leaders = {linked.start}
+    for instruction, opcode in enumerate(linked.opcodes):
+        if opcode in (opcodes.JUMP, opcodes.GUARD, opcodes.LOOP):
+            leaders.add(linked.operands_a[instruction])
+        elif opcode in compareOperators:
+            leaders.update((instruction + 1, instruction + 2))
+    return sorted(leaders)
+
+
+# makeBlock :: program -> int -> set -> int -> bool -> bool -> List[str]
+def makeBlock(linked: program, leader: int, leaders: set, memory_size: int, wrapped: bool,
+              guarded: bool) -> List[str]:
+    """
+    Generate the python lines of the basic block starting at leader
+    :param linked: Program made by the linker
+    :param leader: First instruction of the block
+    :param leaders: All leaders of the program
+    :param memory_size: Size of the memory which is inlined in the range checks
+    :param wrapped: Wrap the arithmetic results around to the word size of the memory
+    :param guarded: Count the steps at the jumps and compares and check the limits before an exit, error or print
+    :return: Lines of the block without indentation
+    """
+    # count :: int -> str -> List[str]
+    def count(end: int, position: str) -> List[str]:
+        """
+        Lines that count the steps of the machine block, which starts at b, up to end and check the limits when
+        needed. The machine block continues at position.
+        """
+        return [f'c = {end} - b', 's += c', f'if s >= n: n = g.check(s, {position}, m, p, b, c)', f'b = {position}']
+
+    # Statement before an instruction that raises an error or prints
+    check = 'checkUpTo(g, s, {}, b, m, p); ' if guarded else ''
+
+    lines = []
+    instruction = leader
+    while True:
+        opcode, a, b = linked.opcodes[instruction], linked.operands_a[instruction], linked.operands_b[instruction]
+
+        if opcode == opcodes.ADD:
+            lines.append(f'm[p] = w(m[p] + {a})' if wrapped else f'm[p] += {a}')
+        elif opcode == opcodes.SET:
+            lines.append(f'm[p] = w({a})' if wrapped else f'm[p] = {a}')
+        elif opcode == opcodes.MULTIPLY:
+            lines.append(f'm[p] = w(m[p] * {a})' if wrapped else f'm[p] *= {a}')
+        elif opcode == opcodes.MOVE:
+            lines.append(f'm[{a}] = m[p]')
+        elif opcode == opcodes.POINT:
+            lines.append(f'p = {a}')
+        elif opcode in (opcodes.PRINT, opcodes.GUARD_PRINT):
+            lines.append(f'{check.format(instruction)}out(m[p], end="")')
+        elif opcode == opcodes.STEP:
+            lines.append(f'p += {a}' if a > 0 else f'p -= {-a}')
+        elif opcode == opcodes.SHIFT:
+            new_pointer = f'p + {a}' if a > 0 else f'p - {-a}'
+            lines.append(f'if not 0 <= {new_pointer} < {memory_size}: '
+                         f'{check.format(instruction)}fail(linked, {instruction}, {new_pointer}, sys)')
+            lines.append(f'p = {new_pointer}')
+        elif opcode == opcodes.AFFINE:
+            lines.append(f'm[p] = w(m[p] * {a} + {b})' if wrapped else f'm[p] = m[p] * {a} + {b}')
+        elif opcode == opcodes.WALK:
+            node = linked.nodes[a]
+            lines.append(f'if not 0 <= p + {node.low} or not p + {node.high} < {memory_size}: '
+                         f'{check.format(instruction)}sys.memory_pointer = p; stop(linked, {instruction}, sys)')
+            lines.append(f'p += {node.move_amount}' if node.pointer_pos is None else f'p = {node.pointer_pos}')
+        elif opcode == opcodes.JUMP:
+            return lines + [f'pc = {a}']
+        elif opcode == opcodes.GUARD:
+            return lines + [f'pc = {a}'] + count(instruction + 1, 'pc')
+        elif opcode == opcodes.LOOP:
+            return lines + [f'pc = ff(linked.loops[{b}], m, p, sys)']
+        elif opcode in compareOperators:
+            return lines + [f'pc = {instruction + 1} if m[{a}] {compareOperators[opcode]} m[{b}] '
+                            f'else {instruction + 2}'] + (count(instruction + 1, 'pc') if guarded else [])
+        elif opcode == opcodes.EXIT:
+            return lines + [f'{check.format(instruction)}return {instruction}']
+        elif opcode in (opcodes.FAIL, opcodes.OUTSIDE):
+            return lines + [f'{check.format(instruction)}sys.memory_pointer = p; stop(linked, {instruction}, sys)']
+
+        instruction += 1
+        if instruction in leaders:
+            return lines + [f'pc = {instruction}']
+
+
+# makeDispatch :: program -> List[int] -> set -> int -> int -> int -> int -> bool -> bool -> List[str]
+def makeDispatch(linked: program, leaders: List[int], leader_set: set, low: int, high: int, depth: int,
+                 memory_size: int, wrapped: bool, guarded: bool) -> List[str]:
+    """
+    Generate a binary search over the leaders, so every dispatch only needs log2(blocks) comparisons
+    :param linked: Program made by the linker
+    :param leaders: Sorted leaders
+    :param leader_set: The same leaders as a set
+    :param low: First leader (inclusive) of this part of the search
+    :param high: Last leader (exclusive) of this part of the search
+    :param depth: Indentation depth
+    :param memory_size: Size of the memory
+    :param wrapped: Wrap the arithmetic results around to the word size of the memory
+    :param guarded: Count the steps and check the limits of a guarded program
+    :return: Indented lines
+    """
+    indent = '    ' * depth
+    if high - low == 1:
+        return list(map(lambda line: indent + line,
+                        makeBlock(linked, leaders[low], leader_set, memory_size, wrapped, guarded)))
+
+    middle = (low + high) // 2
+    return [f'{indent}if pc < {leaders[middle]}:'] + \
+        makeDispatch(linked, leaders, leader_set, low, middle, depth + 1, memory_size, wrapped, guarded) + \
+        [f'{indent}else:'] + \
+        makeDispatch(linked, leaders, leader_set, middle, high, depth + 1, memory_size, wrapped, guarded)
+
+
+# jitSource :: program -> system -> bool -> str
+def jitSource(linked: program, sys: system, guarded: bool = False) -> str:
+    """
+    Translate the linked program to the source of a single python function
+    :param linked: Program made by the linker
+    :param sys: Virtual system which is prepared by makeAST
+    :param guarded: Count the steps and check the limits of a guarded program
+    :return: Python source which defines hra_program(m, p, sys, g)
+    """
+    leaders = findLeaders(linked)
+    return '\n'.join([
+        'def hra_program(m, p, sys, g):',
+        '    w = sys.wrap',
+        f'    pc = b = {linked.start}',
+        '    s, n = (g.run_limits.start_steps, g.next_check) if g else (0, 0)',
+        '    try:',
+        '        while True:',
+        *makeDispatch(linked, leaders, set(leaders), 0, len(leaders), 3, len(sys.memory), bool(sys.word_size),
+                      guarded),
+        '    finally:',
+        '        sys.memory_pointer = p',
+        ''
+    ])
+
+
+# fail :: program -> int -> int -> system -> None
+def fail(linked: program, instruction: int, index: int, sys: system) -> None:
+    """
+    Raise the error of a SHIFT instruction that moves the memory pointer outside the memory
+    :param linked: Program made by the linker
+    :param instruction: Index of the SHIFT instruction
+    :param index: Memory pointer after the instruction
+    :param sys: Virtual system
+    """
+    check_range(index, sys, linked.nodes[linked.indexes[instruction]])
+
+
+# jitCompile :: program -> system -> bool -> Callable
+def jitCompile(linked: program, sys: system,
+               guarded: bool = False) -> Callable[[List[int], int, system, Optional[guard]], int]:
+    """
+    Compile the linked program to a python function. The function does not hold the system, so it runs on every
+    system with the same memory size and word size as the given system.
+    :param linked: Program made by the linker
+    :param sys: Virtual system which is prepared by makeAST
+    :param guarded: Check the limits at every jump, the function then needs the guard of the run
+    :return: Function which runs the program on the memory, memory pointer, system and guard of a run and returns
+        the index of the exit instruction
+    """
+    if guarded:
+        linked = guardProgram(linked)
+    namespace: Dict[str, Any] = {'out': print, 'fail': fail, 'stop': stop, 'linked': linked, 'ff': fastForward,
+                                 'checkUpTo': checkUpTo}
+    exec(compile(jitSource(linked, sys, guarded), '<hra-jit>', 'exec'), namespace)
+    return namespace['hra_program']
+
+
+# jit :: program -> system -> Optional[limits] -> Optional[Callable] -> system
+def jit(linked: program, sys: system, run_limits: Optional[limits] = None,
+        compiled: Optional[Callable[[List[int], int, system, Optional[guard]], int]] = None) -> system:
+    """
+    Compile the linked program to python and run it on the virtual system. This gives the same output and final
+    state as the runner and the machine.
+    :param linked: Program made by the linker
+    :param sys: Virtual system which is prepared by makeAST
+    :param run_limits: Limits of the run, these are checked at every jump and compare like the machine does
+    :param compiled: Function of jitCompile for this program, guarded when the run has limits. This skips the
+        compilation when the same program runs many times.
+    :return: The system after running the program
+    """
+    if compiled is None:
+        compiled = jitCompile(linked, sys, bool(run_limits))
+    run_guard = guard(run_limits, linked) if run_limits else None
+
+    exit_instruction = compiled(sys.memory, sys.memory_pointer, sys, run_guard)
+
+    # Like the runner, the final state holds the instruction pointer of the last executed node
+    if exit_instruction != linked.start:
+        sys.instruction_pointer = linked.indexes[exit_instruction] - 1
+    return sys
@@ -1,7 +1,7 @@
 # Libraries
 import time
 from enum import Enum
-from typing import List, Union, Tuple
+from typing import List, Union, Tuple, Dict, Any
 from dataclasses import dataclass, field
 
 
@@ -44,81 +44,65 @@ class found_token:
     content: str = field(default='')
 
 
-# fixVariableTokens :: List[found_token] -> Int -> List[found_token]
-def fixVariableTokens(checklist: List[found_token], b_index: int = 0, tmp_list=None) -> List[found_token]:
+# Key of the token that ends at a node of the keyword trie
+keywordEnd = None
+
+
+# makeKeywordTrie :: List[tokens] -> Dict[Union[str, None], Any]
+def makeKeywordTrie(keywords: List[tokens]) -> Dict[Union[str, None], Any]:
     """
-    Function that reinterprets the row and checks if possible longer tokens has been missed
-    :param checklist: List with found tokens
-    :param b_index: Internally used row, should not be used
-    :param tmp_list: Internally used list for checking the possible tokens, should not be used
-    :return: Fixed row with the correct tokens
+    Make a trie of the words of the keywords, every node maps the next word to a deeper node and
+    keywordEnd to the token when the words up to that node form a keyword
+    :param keywords: Tokens with their keyword as value
+    :return: Root of the trie
     """
-    # If tmp_list is not a list, make it a list
-    if tmp_list is None:
-        tmp_list = []
+    root: Dict[Union[str, None], Any] = {}
+    for keyword in filter(lambda token: token.value, keywords):
+        trie_node = root
+        for word in keyword.value.split(' '):
+            trie_node = trie_node.setdefault(word, {})
+        trie_node[keywordEnd] = keyword
+    return root
 
-    # Check if the b_index is larger than the checklist
-    # Otherwise return the fixed row
-    if len(checklist) <= b_index:
-        return checklist
 
-    # Append a found_token in the checklist
-    tmp_list.append(checklist[b_index])
+# Prebuilt lookup tables of all keywords
+keywordTrie: Dict[Union[str, None], Any] = makeKeywordTrie(list(tokens))
+wordTokens: Dict[str, tokens] = dict(map(
+    lambda token: (token.value, token,), filter(lambda token: ' ' not in token.value, tokens)
+))
 
-    # Get all possible longer tokens
-    long_tokens: List[tokens] = list(filter(
-        lambda poss_token: poss_token.value.count(" ") == len(tmp_list) - 1, tokens
-    ))
-    # Get the strings of all the tokens for easier comparing
-    long_tokens_str: List[List[str]] = list(map(
-        lambda long_token: long_token.value.split(" "), long_tokens
-    ))
-    # Get the string of the check tmp_list
-    token_str: List[str] = list(map(
-        lambda a_token: a_token.content, tmp_list
-    ))
-    # Try to find a token in the possible longer tokens, otherwise return None
-    possible_token: Union[None, Tuple[str, tokens]] = next(filter(
-        lambda long_token: token_str == long_token[0], zip(long_tokens_str, long_tokens)
-    ), None)
-
-    # If the retrieved token is None try again with the next found_token
-    if possible_token is None:
-        return fixVariableTokens(checklist, b_index + 1, tmp_list)
-
-    # Insert newly found token into the list
-    checklist.insert(
-        b_index + 1,
-        found_token(
-            possible_token[1],
-            checklist[b_index].row,
-            " ".join(token_str)
-        )
-    )
-    # Remove the old VARIABLE tokens so only the newly inserted token will be left
-    del checklist[b_index - (len(tmp_list) - 1): b_index + 1]
 
-    # Go back with the recursive function
-    return fixVariableTokens(checklist, b_index + 1, tmp_list)
+# matchKeyword :: List[str] -> Tuple[Union[tokens, None], int]
+def matchKeyword(row_words: List[str]) -> Tuple[Union[tokens, None], int]:
+    """
+    Find the shortest keyword the row starts with by walking the keyword trie
+    :param row_words: Words of the row
+    :return: The found token and its amount of words, or None and 0 when the row does not start with a keyword
+    """
+    trie_node = keywordTrie
+    for length, word in enumerate(row_words, 1):
+        trie_node = trie_node.get(word)
+        if trie_node is None:
+            break
+        if keywordEnd in trie_node:
+            return trie_node[keywordEnd], length
+    return None, 0
 
 
 # getTokens :: List[str] -> Int -> List[found_token]
 def getTokens(row_words: List[str], index: int) -> List[found_token]:
     """
-    Generate from a row of strings found_token objects with the
-    :param row_words:
-    :param index:
-    :return:
+    Generate the found_token objects of a row, the row can start with a keyword of multiple words
+    and every other word is a token on its own
+    :param row_words: Words of the row
+    :param index: Row of the words
+    :return: Tokens of the row
     """
-    if not row_words:
-        return []
-
-    current_word = row_words[0]
-    new_token = next(filter(lambda token: token.value == current_word, tokens), None)
-    if new_token is None:
-        return [found_token(tokens.VARIABLE, index, current_word)] + getTokens(row_words[1:], index)
-    else:
-        return [found_token(new_token, index, current_word)] + getTokens(row_words[1:], index)
+    keyword, length = matchKeyword(row_words)
+    row_tokens = [] if keyword is None else [found_token(keyword, index, ' '.join(row_words[:length]))]
+    return row_tokens + list(map(
+        lambda word: found_token(wordTokens.get(word, tokens.VARIABLE), index, word), row_words[length:]
+    ))
 
 
 # removeSpaces :: List[str] -> Union[None, List[str]]
@@ -128,11 +112,11 @@ def removeSpaces(row_words: List[str]) -> Union[None, List[str]]:
     :param row_words: Row of words which needs to be filtered
     :return: Filtered list where the first row is a wordt and no space
     """
-    if not row_words:
+    first_word = next(filter(lambda index: row_words[index] and not row_words[index].isspace(),
+                             range(len(row_words))), None)
+    if first_word is None:
         return None
-    elif (word := row_words[0]).isspace() or not word:
-        return removeSpaces(row_words[1:])
-    return row_words
+    return row_words[first_word:]
 
 
 # lexer :: str -> List[List[found_token]]
@@ -152,7 +136,5 @@ def lexer(file_content: str) -> List[List[found_token]]:
         map(lambda line: removeSpaces(line), words))
     )
     remove_comments = list(filter(lambda row: row[0] != tokens.COMMENT.value, fixed_words))
-    found_tokens = list(map(lambda row: getTokens(row[1], row[0] + 1), enumerate(remove_comments)))
-    fixed_tokens = list(map(lambda row_token: fixVariableTokens(row_token), found_tokens))
-    return fixed_tokens
+    return list(map(lambda row: getTokens(row[1], row[0] + 1), enumerate(remove_comments)))
 
@@ -0,0 +1,226 @@
+# Libraries
+import time
+import hashlib
+from array import array
+from dataclasses import dataclass, field, replace
+from typing import List, Iterator, Optional, Union
+
+# HRA files
+from .linker import program, opcodes
+from .nodes import BaseNode
+from .system import system
+from .checkpoint import checkpoints, checkpoint, writeCheckpoint, terminationRequest
+
+
+@dataclass
+class limits:
+    """
+    Limits of a run, every limit is disabled when it is None
+    """
+    # Maximum amount of executed steps
+    max_steps: Optional[int] = field(default=None)
+
+    # Maximum wall time of the run in seconds
+    timeout: Optional[float] = field(default=None)
+
+    # Amount of steps between two samples of the cycle detection. A deterministic program that reaches a state
+    # it has been in before never stops.
+    cycle_interval: Optional[int] = field(default=None)
+
+    # Checkpoints of the run, these are written at the same checks as the limits
+    checkpoint: Optional[checkpoints] = field(default=None)
+
+    # Steps executed before this run, a run which continues from a checkpoint keeps counting from there
+    start_steps: int = field(default=0)
+
+    def __bool__(self) -> bool:
+        return any(map(lambda limit: limit is not None,
+                       (self.max_steps, self.timeout, self.cycle_interval, self.checkpoint)))
+
+
+# Amount of steps between two checks of the timeout when there is no cycle detection
+timeoutInterval = 4096
+
+
+@dataclass
+class guard:
+    """
+    Checks the limits while a program runs. The engines count the steps themselves and only call check when the
+    steps reach next_check, so a guarded run stays almost as fast as a run without limits. The cycle detection
+    follows Brent's algorithm over the sampled states, so it only keeps the hash of a single saved state no matter
+    how long the program runs.
+    """
+    run_limits: limits
+    linked: Optional[program] = field(default=None, repr=False)
+
+    next_check: int = field(default=0, init=False)
+    next_checkpoint: Optional[int] = field(default=None, init=False)
+    deadline: Optional[float] = field(default=None, init=False, repr=False)
+
+    # Cycle detection state: hash and step of the saved state, samples since then and the size of the window
+    saved_hash: Optional[bytes] = field(default=None, init=False, repr=False)
+    saved_step: int = field(default=0, init=False, repr=False)
+    samples: int = field(default=0, init=False, repr=False)
+    window: int = field(default=1, init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        """
+        Post init, the timeout starts when the guard is made
+        """
+        if self.run_limits.timeout is not None:
+            self.deadline = time.perf_counter() + self.run_limits.timeout
+        if self.run_limits.checkpoint is not None and self.run_limits.checkpoint.interval is not None:
+            self.next_checkpoint = self.run_limits.start_steps + self.run_limits.checkpoint.interval
+        self.next_check = self.nextCheck(self.run_limits.start_steps)
+
+    def nextCheck(self, steps: int) -> int:
+        """
+        Get the amount of steps at which the limits have to be checked again
+        :param steps: Current amount of steps
+        :return: Steps of the next check
+        """
+        interval = timeoutInterval if self.run_limits.cycle_interval is None else self.run_limits.cycle_interval
+        next_check = steps + interval
+        if self.next_checkpoint is not None:
+            next_check = min(next_check, self.next_checkpoint)
+        if self.run_limits.max_steps is None:
+            return next_check
+        return min(next_check, self.run_limits.max_steps + 1)
+
+    def nodeIndex(self, position: int) -> int:
+        """
+        Get the node index of a position in the program
+        :param position: Instruction index for the machine or node index for the runner
+        :return: Node index
+        """
+        return position if self.linked is None else self.linked.indexes[position]
+
+    def row(self, position: int) -> int:
+        """
+        Get the row of a position in the program
+        :param position: Instruction index for the machine or node index for the runner
+        :return: Row in the HRA file
+        """
+        return self.nodeIndex(position) + 1
+
+    def saveCheckpoint(self, steps: int, position: int, memory: Union[List[int], array], memory_pointer: int) -> None:
+        """
+        Write the state of the run as a checkpoint, the run continues at the position when it is resumed
+        :param steps: Amount of executed steps
+        :param position: Next instruction index for the machine or next node index for the runner
+        :param memory: Memory of the run
+        :param memory_pointer: Memory pointer of the run
+        """
+        settings = self.run_limits.checkpoint
+        writeCheckpoint(settings.filename, checkpoint(
+            program_hash=settings.program_hash,
+            steps=steps,
+            instruction_pointer=self.nodeIndex(position),
+            memory_pointer=memory_pointer,
+            word_size=memory.itemsize * 8 if isinstance(memory, array) else 0,
+            memory=memory
+        ))
+
+    def check(self, steps: int, position: int, memory: Union[List[int], array], memory_pointer: int,
+              block_start: Optional[int] = None, block_steps: int = 0) -> int:
+        """
+        Check the limits, the position, memory and memory pointer together are the full state of the run
+        :param steps: Amount of executed steps
+        :param position: Next instruction index for the machine or next node index for the runner
+        :param memory: Memory of the run
+        :param memory_pointer: Memory pointer of the run
+        :param block_start: First instruction of the block the machine checks at the end of, None for the runner
+        :param block_steps: Amount of steps of that block, every instruction of a block is a single step
+        :return: Steps of the next check
+        """
+        run_limits = self.run_limits
+        if run_limits.checkpoint is not None:
+            if terminationRequest.is_set():
+                self.saveCheckpoint(steps, position, memory, memory_pointer)
+                raise RuntimeError(f"Stopped at row {self.row(position)} after {steps} steps, the run is terminated "
+                                   f"and its state is written to {run_limits.checkpoint.filename}")
+
+            if self.next_checkpoint is not None and steps >= self.next_checkpoint:
+                self.saveCheckpoint(steps, position, memory, memory_pointer)
+                self.next_checkpoint = steps + run_limits.checkpoint.interval
+
+        if run_limits.max_steps is not None and steps > run_limits.max_steps:
+            # The machine checks at the end of a block, the runner stops at the first step past the limit
+            passed = run_limits.max_steps + 1
+            step = passed - (steps - block_steps)
+            if block_start is not None and 0 < step < block_steps:
+                position, steps = block_start + step, passed
+            raise RuntimeError(f"Stopped at row {self.row(position)} after {steps} steps, "
+                               f"the limit is {run_limits.max_steps} steps")
+
+        if self.deadline is not None and time.perf_counter() > self.deadline:
+            raise RuntimeError(f"Stopped at row {self.row(position)} after {steps} steps, "
+                               f"the run took longer than {run_limits.timeout} seconds")
+
+        if run_limits.cycle_interval is not None:
+            state_hash = stateHash(position, memory, memory_pointer)
+            if state_hash == self.saved_hash:
+                raise RuntimeError(f"Stopped at row {self.row(position)} after {steps} steps, the state of step "
+                                   f"{self.saved_step} repeats, so the program never stops")
+
+            # Move the saved state forward every time the window is full and double the window
+            self.samples += 1
+            if self.samples == self.window:
+                self.saved_hash, self.saved_step = state_hash, steps
+                self.samples = 0
+                self.window *= 2
+
+        self.next_check = self.nextCheck(steps)
+        return self.next_check
+
+
+# stateHash :: int -> Union[List[int], array] -> int -> bytes
+def stateHash(position: int, memory: Union[List[int], array], memory_pointer: int) -> bytes:
+    """
+    Hash the full state of a run
+    :param position: Instruction index for the machine or node index for the runner
+    :param memory: Memory of the run
+    :param memory_pointer: Memory pointer of the run
+    :return: Hash of the state
+    """
+    digest = hashlib.blake2b(f'{position} {memory_pointer} '.encode(), digest_size=16)
+    digest.update(memory.tobytes() if isinstance(memory, array) else repr(memory).encode())
+    return digest.digest()
+
+
+# guardProgram :: program -> program
+def guardProgram(linked: program) -> program:
+    """
+    Copy the linked program with every JUMP replaced by a GUARD and every compare and PRINT by its guarded
+    instruction. The blocks between the jumps and compares are straight, so the engines count the steps of a whole
+    block at its end. A LOOP is guarded as a normal jump, so every step of a fast-forwarded loop is counted.
+    :param linked: Program made by the linker
+    :return: Guarded program
+    """
+    guarded = array('B', linked.opcodes)
+    for instruction, opcode in enumerate(guarded):
+        if opcode in (opcodes.JUMP, opcodes.LOOP):
+            guarded[instruction] = opcodes.GUARD
+        elif opcodes.GREATER <= opcode <= opcodes.UNEQUAL:
+            guarded[instruction] = opcode - opcodes.GREATER + opcodes.GUARD_GREATER
+        elif opcode == opcodes.PRINT:
+            guarded[instruction] = opcodes.GUARD_PRINT
+    return replace(linked, opcodes=guarded)
+
+
+# guardNodes :: Iterator[BaseNode] -> system -> limits -> Iterator[BaseNode]
+def guardNodes(performed: Iterator[BaseNode], sys: system, run_limits: limits) -> Iterator[BaseNode]:
+    """
+    Check the limits after every performed node of the runner
+    :param performed: Iterator over the performed nodes
+    :param sys: Virtual system the nodes are performed on
+    :param run_limits: Limits of the run
+    :return: Iterator over the same nodes
+    """
+    run_guard = guard(run_limits)
+    next_check = run_guard.next_check
+    for steps, node in enumerate(performed, run_limits.start_steps + 1):
+        # The next node and the memory decide the rest of the run
+        if steps >= next_check:
+            next_check = run_guard.check(steps, sys.instruction_pointer + 1, sys.memory, sys.memory_pointer)
+        yield node
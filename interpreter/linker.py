@@ -0,0 +1,292 @@
+# Libraries
+from array import array
+from enum import IntEnum
+from dataclasses import dataclass, field
+from typing import List, Dict, Union, Tuple, Any
+
+# HRA files
+from .nodes import RightMemoryNode, RightInstructionNode, LeftMemoryNode, LeftInstructionNode, MoveMemoryNode, \
+    MoveInstructionNode, MoveMemoryValueNode, PrintNode, FunctionNode, CallNode, ExitNode, GreaterNode, \
+    LessNode, EqualNode, UnequalNode, SetNode, IncrementNode, DecrementNode, MultiplyNode, BaseNode, \
+    SuperBaseNode, ShiftMemoryNode, ArithmeticNode
+from .system import system
+
+
+class opcodes(IntEnum):
+    """
+    Instructions of the linked program, every instruction has at most two operands (a and b).
+    All instructions continue with the next instruction unless stated otherwise.
+    """
+    NOP = 0         # Does nothing (close function)
+    SHIFT = 1       # Add a to the memory pointer
+    POINT = 2       # Set the memory pointer to a
+    JUMP = 3        # Continue at instruction a
+    MOVE = 4        # Copy the current memory cell to cell a
+    PRINT = 5       # Print the current memory cell
+    GREATER = 6     # Compare cell a > cell b, if False skip the next instruction
+    LESS = 7        # Compare cell a < cell b, if False skip the next instruction
+    EQUAL = 8       # Compare cell a == cell b, if False skip the next instruction
+    UNEQUAL = 9     # Compare cell a != cell b, if False skip the next instruction
+    SET = 10        # Set the current memory cell to a
+    ADD = 11        # Add a to the current memory cell
+    MULTIPLY = 12   # Multiply the current memory cell by a
+    EXIT = 13       # Stop executing
+    FAIL = 14       # Perform node a with the runner, used for nodes that can only raise an error
+    OUTSIDE = 15    # Instruction pointer a is outside the program
+    AFFINE = 16     # Set the current memory cell to value * a + b
+    WALK = 17       # Move the memory pointer like ShiftMemoryNode a, which can pass outside the memory on its way
+    STEP = 18       # Add a to the memory pointer, the bounds analysis proved it stays inside the memory
+    GUARD = 19      # Check the limits of the run and continue at instruction a, replaces JUMP in a guarded program
+    LOOP = 20       # Fast-forward counted loop b and continue at instruction a, replaces JUMP in an accelerated program
+
+    # Compares of a guarded program, these end a block so the skipped instruction is not counted as a step
+    GUARD_GREATER = 21
+    GUARD_LESS = 22
+    GUARD_EQUAL = 23
+    GUARD_UNEQUAL = 24
+
+    # Print of a guarded program, which checks the limits first so nothing is printed after the last step
+    GUARD_PRINT = 25
+
+
+@dataclass
+class program:
+    """
+    Linked program, the instructions are stored in parallel arrays where every index is one instruction.
+    All jump and call targets are resolved to absolute instruction indexes. Nodes that are fused into a
+    superinstruction by the optimizer do not get an instruction.
+    """
+    opcodes: array = field(repr=False)
+    operands_a: Union[array, List[int]] = field(repr=False)
+    operands_b: Union[array, List[int]] = field(repr=False)
+
+    # Node index of every instruction, sentinels past the nodes store the instruction pointer they represent.
+    # A program that jumps to a negative node index starts with a copy of the nodes at their negative indexes.
+    indexes: array = field(repr=False)
+
+    start: int
+    nodes: List[BaseNode] = field(repr=False)
+
+    # Counted loops of the LOOP instructions, filled in by the accelerator
+    loops: List[Any] = field(default_factory=list, repr=False)
+
+    def __len__(self) -> int:
+        return len(self.opcodes)
+
+
+# compactOperands :: List[int] -> Union[array, List[int]]
+def compactOperands(operands: List[int]) -> Union[array, List[int]]:
+    """
+    Store the operands in a 64 bit array, values in HRA are unbounded so a list is used when they do not fit
+    :param operands: Operands of all instructions
+    :return: Compact storage of the operands
+    """
+    try:
+        return array('q', operands)
+    except OverflowError:
+        return operands
+
+
+# nodeTarget :: BaseNode -> int -> system -> Union[int, None]
+def nodeTarget(node: BaseNode, index: int, sys: system) -> Union[int, None]:
+    """
+    Get the node index that will be executed after the given node when it moves the instruction pointer
+    :param node: Node that is being linked
+    :param index: Index of the node
+    :param sys: System with the registered functions
+    :return: Index of the next node or None when the node does not move the instruction pointer
+    """
+    if isinstance(node, RightInstructionNode):
+        return index + node.move_amount
+    elif isinstance(node, LeftInstructionNode):
+        return index - node.move_amount
+    elif isinstance(node, MoveInstructionNode):
+        return node.pointer_pos - 1
+    elif isinstance(node, FunctionNode):
+        return node.instruction_index + 1
+    elif isinstance(node, CallNode) and node.func_name in sys.functions:
+        return sys.functions[node.func_name].instruction_index + 1
+    return None
+
+
+# inRange :: List[int] -> system -> bool
+def inRange(indexes: List[int], sys: system) -> bool:
+    """
+    Check if all memory indexes are inside the memory of the system
+    :param indexes: Memory indexes
+    :param sys: System to check against
+    :return: True if all indexes are inside the memory
+    """
+    return all(map(lambda index: 0 <= index < len(sys.memory), indexes))
+
+
+# linkShift :: ShiftMemoryNode -> int -> system -> Tuple[opcodes, int, int]
+def linkShift(node: ShiftMemoryNode, index: int, sys: system) -> Tuple[opcodes, int, int]:
+    """
+    Link a superinstruction of the memory pointer, a walk that can leave the memory is checked with a WALK
+    instruction. A single SHIFT is not enough, the fused nodes have to fail at the row and pointer of the first
+    step outside the memory.
+    :param node: Superinstruction of the optimizer
+    :param index: Index of the node
+    :param sys: System with the memory
+    :return: Instruction of the node
+    """
+    if node.absolute_low is not None and not inRange([node.absolute_low, node.absolute_high], sys):
+        return opcodes.FAIL, index, 0
+
+    if not node.range_checked:
+        if node.pointer_pos is None:
+            return opcodes.STEP, node.move_amount, 0
+        return opcodes.POINT, node.pointer_pos, 0
+
+    if node.pointer_pos is not None and node.low == node.high == 0:
+        return opcodes.POINT, node.pointer_pos, 0
+    return opcodes.WALK, index, 0
+
+
+# linkArithmetic :: ArithmeticNode -> Tuple[opcodes, int, int]
+def linkArithmetic(node: ArithmeticNode) -> Tuple[opcodes, int, int]:
+    """
+    Link a superinstruction of the memory value to the simplest instruction that does the same
+    :param node: Superinstruction of the optimizer
+    :return: Instruction of the node
+    """
+    if node.multiplier == 0:
+        return opcodes.SET, node.change_value, 0
+    elif node.multiplier == 1:
+        return opcodes.ADD, node.change_value, 0
+    elif node.change_value == 0:
+        return opcodes.MULTIPLY, node.multiplier, 0
+    return opcodes.AFFINE, node.multiplier, node.change_value
+
+
+# linker :: List[BaseNode] -> system -> program
+def linker(nodes: List[BaseNode], sys: system) -> program:
+    """
+    Link the nodes of makeAST to a program for the machine
+    :param nodes: Nodes which are prepared by makeAST, these can be optimized by the optimizer
+    :param sys: System which is prepared by makeAST
+    :return: Linked program
+    """
+    nodes_amount = len(nodes)
+
+    # Every node that is not fused into a superinstruction gets an instruction
+    linked_nodes = []
+    index = 0
+    while index < nodes_amount:
+        linked_nodes.append(index)
+        index += len(nodes[index].fused) if isinstance(nodes[index], SuperBaseNode) else 1
+
+    # The runner keeps a negative instruction pointer after a jump to a negative index and counts up from there, after
+    # -1 it continues at the first node. A copy of the nodes at their negative indexes in front of the nodes makes the
+    # machine report the same instruction pointer and lets relative jumps from the copy go where the runner goes.
+    if -nodes_amount <= sys.instruction_pointer < 0 or any(map(
+            lambda index: -nodes_amount <= (nodeTarget(nodes[index], index, sys) or 0) < 0, linked_nodes)):
+        linked_nodes = list(map(lambda index: index - nodes_amount, linked_nodes)) + linked_nodes
+    positions = dict(map(lambda position: (position[1], position[0]), enumerate(linked_nodes)))
+
+    instructions = []
+    targets: List[int] = []
+    sentinels: Dict[int, int] = {}
+
+    # resolve :: int -> int
+    def resolve(target: int) -> int:
+        """
+        Resolve a node index to an instruction index, nodes outside the program get an OUTSIDE sentinel
+        """
+        if target in positions:
+            return positions[target]
+        if -nodes_amount <= target < nodes_amount:
+            raise RuntimeError(f"Can not link a jump to row {target % nodes_amount + 1} which is inside a "
+                               f"superinstruction")
+        if target not in sentinels:
+            sentinels[target] = len(positions) + len(sentinels)
+        return sentinels[target]
+
+    # The two sentinels directly after the program are needed for running and skipping past the last node
+    resolve(nodes_amount)
+    resolve(nodes_amount + 1)
+
+    for index in positions:
+        node = nodes[index]
+        if isinstance(node, (RightMemoryNode, LeftMemoryNode)):
+            direction = 1 if isinstance(node, RightMemoryNode) else -1
+            opcode = opcodes.SHIFT if node.range_checked else opcodes.STEP
+            instructions.append((opcode, direction * node.move_amount, 0))
+
+        elif isinstance(node, ShiftMemoryNode):
+            instructions.append(linkShift(node, index, sys))
+        elif isinstance(node, ArithmeticNode):
+            instructions.append(linkArithmetic(node))
+
+        elif isinstance(node, MoveMemoryNode):
+            if inRange([node.pointer_pos], sys):
+                instructions.append((opcodes.POINT, node.pointer_pos, 0))
+            else:
+                instructions.append((opcodes.FAIL, index, 0))
+
+        elif isinstance(node, MoveMemoryValueNode):
+            if inRange([node.pointer_pos], sys):
+                instructions.append((opcodes.MOVE, node.pointer_pos, 0))
+            else:
+                instructions.append((opcodes.FAIL, index, 0))
+
+        elif isinstance(node, (GreaterNode, LessNode, EqualNode, UnequalNode)):
+            if isinstance(node, GreaterNode):
+                opcode = opcodes.GREATER
+            elif isinstance(node, LessNode):
+                opcode = opcodes.LESS
+            elif isinstance(node, EqualNode):
+                opcode = opcodes.EQUAL
+            else:
+                opcode = opcodes.UNEQUAL
+
+            if inRange([node.lhs, node.rhs], sys):
+                instructions.append((opcode, node.lhs, node.rhs))
+            else:
+                instructions.append((opcodes.FAIL, index, 0))
+
+        elif isinstance(node, SetNode):
+            instructions.append((opcodes.SET, node.change_value, 0))
+        elif isinstance(node, IncrementNode):
+            instructions.append((opcodes.ADD, node.change_value, 0))
+        elif isinstance(node, DecrementNode):
+            instructions.append((opcodes.ADD, -node.change_value, 0))
+        elif isinstance(node, MultiplyNode):
+            instructions.append((opcodes.MULTIPLY, node.change_value, 0))
+
+        elif isinstance(node, PrintNode):
+            instructions.append((opcodes.PRINT, 0, 0))
+        elif isinstance(node, ExitNode):
+            instructions.append((opcodes.EXIT, 0, 0))
+
+        elif isinstance(node, CallNode) and node.func_name not in sys.functions:
+            instructions.append((opcodes.FAIL, index, 0))
+
+        elif (target := nodeTarget(node, index, sys)) is not None:
+            if target == index + 1:
+                instructions.append((opcodes.NOP, 0, 0))
+            else:
+                instructions.append((opcodes.JUMP, resolve(target), 0))
+
+        else:
+            instructions.append((opcodes.NOP, 0, 0))
+
+        targets.append(index)
+
+    start = resolve(sys.instruction_pointer)
+
+    # Add the sentinels, they all stop the program
+    for target in sentinels:
+        instructions.append((opcodes.OUTSIDE, target, 0))
+        targets.append(target)
+
+    codes, operands_a, operands_b = zip(*instructions)
+    return program(
+        opcodes=array('B', codes),
+        operands_a=compactOperands(list(operands_a)),
+        operands_b=compactOperands(list(operands_b)),
+        indexes=array('q', targets),
+        start=start,
+        nodes=nodes
+    )
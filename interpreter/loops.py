@@ -0,0 +1,220 @@
+# Libraries
+from array import array
+from dataclasses import dataclass, field, replace
+from typing import List, Dict, Tuple, Union, Optional
+
+# HRA files
+from .linker import program, opcodes
+from .system import system
+
+# Instructions a counted loop may contain besides its exit compare and the jumps
+straightOpcodes = (opcodes.NOP, opcodes.SHIFT, opcodes.POINT, opcodes.ADD, opcodes.STEP, opcodes.WALK)
+compareOpcodes = (opcodes.GREATER, opcodes.LESS, opcodes.EQUAL, opcodes.UNEQUAL)
+
+
+@dataclass
+class counted_loop:
+    """
+    Loop of a linked program that only adds constants to memory cells and leaves on a single compare.
+    An increment is stored as (absolute, position, value): the position is a cell index when absolute is True,
+    otherwise it is relative to the memory pointer at the start of the loop.
+    """
+    header: int
+
+    # Lowest and highest position the memory pointer visits relative to the start of the loop
+    low: int
+    high: int
+
+    # The exit compare and whether the loop continues when the compare is True
+    compare: opcodes
+    lhs: int
+    rhs: int
+    continue_on_true: bool
+
+    # Increments before and after the exit compare
+    before: List[Tuple[bool, int, int]] = field(default_factory=list, repr=False)
+    after: List[Tuple[bool, int, int]] = field(default_factory=list, repr=False)
+
+
+# followPath :: program -> int -> int -> Optional[Tuple[List[int], int]]
+def followPath(linked: program, start: int, end: int) -> Optional[Tuple[List[int], int]]:
+    """
+    Follow the instructions from start through the jumps until the end, a compare or any other instruction
+    :param linked: Program made by the linker
+    :param start: First instruction of the path
+    :param end: Instruction at which the path stops
+    :return: The straight instructions on the path and the instruction it stopped at, None if the path never stops
+    """
+    path = []
+    instruction = start
+    # A path that is longer than the program runs in a cycle without the end
+    for _ in range(len(linked) + 1):
+        if instruction == end:
+            return path, instruction
+
+        opcode = linked.opcodes[instruction]
+        if opcode == opcodes.JUMP:
+            instruction = linked.operands_a[instruction]
+        elif opcode in straightOpcodes:
+            path.append(instruction)
+            instruction += 1
+        else:
+            return path, instruction
+    return None
+
+
+# findLoop :: program -> int -> Optional[counted_loop]
+def findLoop(linked: program, jump: int) -> Optional[counted_loop]:
+    """
+    Check if a jump closes a counted loop, the loop starts at the target of the jump
+    :param linked: Program made by the linker
+    :param jump: Index of the JUMP instruction
+    :return: The loop, None if the jump does not close a counted loop
+    """
+    header = linked.operands_a[jump]
+    found = followPath(linked, header, jump)
+    if found is None or found[1] == jump or linked.opcodes[found[1]] not in compareOpcodes:
+        return None
+    before, compare = found
+
+    # Exactly one of the two successors of the compare has to lead back to the jump
+    paths = list(map(lambda successor: followPath(linked, successor, jump), (compare + 1, compare + 2)))
+    returns = list(map(lambda path: path is not None and path[1] == jump, paths))
+    if returns.count(True) != 1:
+        return None
+    after = paths[0][0] if returns[0] else paths[1][0]
+
+    # The memory pointer has to be the same at the start of every round
+    absolute, position = False, 0
+    low = high = 0
+    increments: List[List[Tuple[bool, int, int]]] = [[], []]
+    for part, instructions in enumerate((before, after)):
+        for instruction in instructions:
+            opcode, a = linked.opcodes[instruction], linked.operands_a[instruction]
+            if opcode == opcodes.ADD:
+                increments[part].append((absolute, position, a))
+            elif opcode in (opcodes.SHIFT, opcodes.STEP):
+                position += a
+                if not absolute:
+                    low, high = min(low, position), max(high, position)
+            elif opcode == opcodes.POINT:
+                absolute, position = True, a
+            elif opcode == opcodes.WALK:
+                # A superinstruction visits the memory pointers between its low and high on the way
+                node = linked.nodes[a]
+                if not absolute:
+                    low, high = min(low, position + node.low), max(high, position + node.high)
+                if node.pointer_pos is None:
+                    position += node.move_amount
+                else:
+                    absolute, position = True, node.pointer_pos
+    if not absolute and position:
+        return None
+
+    return counted_loop(
+        header=header,
+        low=low,
+        high=high,
+        compare=opcodes(linked.opcodes[compare]),
+        lhs=linked.operands_a[compare],
+        rhs=linked.operands_b[compare],
+        continue_on_true=returns[0],
+        before=increments[0],
+        after=increments[1]
+    )
+
+
+# accelerator :: program -> program
+def accelerator(linked: program) -> program:
+    """
+    Copy the linked program with every JUMP that closes a counted loop replaced by a LOOP instruction
+    :param linked: Program made by the linker
+    :return: Program of which the counted loops are fast-forwarded
+    """
+    accelerated = array('B', linked.opcodes)
+    operands_b = list(linked.operands_b)
+    loops = []
+    for instruction, opcode in enumerate(linked.opcodes):
+        if opcode == opcodes.JUMP and (loop := findLoop(linked, instruction)) is not None:
+            accelerated[instruction] = opcodes.LOOP
+            operands_b[instruction] = len(loops)
+            loops.append(loop)
+
+    if not loops:
+        return linked
+    return replace(linked, opcodes=accelerated, operands_b=array(linked.operands_b.typecode, operands_b)
+                   if isinstance(linked.operands_b, array) else operands_b, loops=loops)
+
+
+# tripCount :: counted_loop -> int -> int -> Optional[int]
+def tripCount(loop: counted_loop, difference: int, change: int) -> Optional[int]:
+    """
+    Get the amount of rounds the loop continues, the compare sees lhs - rhs = difference + round * change
+    :param loop: Counted loop
+    :param difference: Difference of the compared cells at the compare of the next round
+    :param change: Change of the difference every round
+    :return: Amount of rounds, None if the loop never stops
+    """
+    equal_continues = (loop.compare == opcodes.EQUAL) == loop.continue_on_true
+    if loop.compare in (opcodes.EQUAL, opcodes.UNEQUAL):
+        if equal_continues:
+            # Continue while the difference is 0
+            return 0 if difference else (1 if change else None)
+        if not difference:
+            return 0
+        # Continue until the difference is exactly 0, a change that steps over 0 never stops
+        if change and -difference % change == 0 and -difference // change > 0:
+            return -difference // change
+        return None
+
+    # Turn every compare into continue while difference > threshold
+    if loop.compare == opcodes.LESS:
+        difference, change = -difference, -change
+    threshold = 0 if loop.continue_on_true else -1
+    if not loop.continue_on_true:
+        difference, change = -difference, -change
+
+    if difference <= threshold:
+        return 0
+    if change >= 0:
+        return None
+    return (difference - threshold - change - 1) // -change
+
+
+# fastForward :: counted_loop -> Union[List[int], array] -> int -> system -> int
+def fastForward(loop: counted_loop, memory: Union[List[int], array], memory_pointer: int, sys: system) -> int:
+    """
+    Apply all rounds of a counted loop in one step, except for the last round which leaves the loop.
+    This is called at the end of a round, the rounds are left to the normal execution when the memory pointer
+    would pass outside the memory.
+    :param loop: Counted loop
+    :param memory: Memory of the run
+    :param memory_pointer: Memory pointer at the start of the next round
+    :param sys: Virtual system
+    :return: Header of the loop, where the run continues
+    """
+    if not 0 <= memory_pointer + loop.low or not memory_pointer + loop.high < len(memory):
+        return loop.header
+
+    before: Dict[int, int] = {}
+    changes: Dict[int, int] = {}
+    for part, increments in ((before, loop.before), (None, loop.after)):
+        for absolute, position, value in increments:
+            cell = position if absolute else memory_pointer + position
+            if part is not None:
+                part[cell] = part.get(cell, 0) + value
+            changes[cell] = changes.get(cell, 0) + value
+
+    difference = memory[loop.lhs] + before.get(loop.lhs, 0) - memory[loop.rhs] - before.get(loop.rhs, 0)
+    rounds = tripCount(loop, difference, changes.get(loop.lhs, 0) - changes.get(loop.rhs, 0))
+    if not rounds:
+        return loop.header
+
+    values = {cell: memory[cell] + rounds * change for cell, change in changes.items()}
+    # A cell that would wrap around is left to the normal rounds
+    if sys.word_size and any(map(lambda value: value != sys.wrap(value), values.values())):
+        return loop.header
+
+    for cell, value in values.items():
+        memory[cell] = value
+    return loop.header
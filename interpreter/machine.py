@@ -0,0 +1,219 @@
+# Libraries
+import operator
+from array import array
+from typing import List, Union, Optional
+
+# HRA files
+from .linker import program, opcodes
+from .system import system, check_range
+from .runner import perform
+from .limits import limits, guard, guardProgram
+from .loops import fastForward
+
+# Compare of every guarded compare instruction
+guardedCompares = {
+    int(opcodes.GUARD_GREATER): operator.gt,
+    int(opcodes.GUARD_LESS): operator.lt,
+    int(opcodes.GUARD_EQUAL): operator.eq,
+    int(opcodes.GUARD_UNEQUAL): operator.ne,
+}
+
+
+# machine :: program -> system -> Optional[limits] -> system
+def machine(linked: program, sys: system, run_limits: Optional[limits] = None) -> system:
+    """
+    Execute a linked program on the virtual system until it exits. This gives the same output and final state
+    as the runner, but without going through the nodes.
+    :param linked: Program made by the linker
+    :param sys: Virtual system which is prepared by makeAST
+    :param run_limits: Limits of the run, these are checked at the jumps and compares of a guarded program so a
+        run without limits is not slower
+    :return: The system after running the program
+    """
+    run_guard = None
+    if run_limits:
+        linked = guardProgram(linked)
+        run_guard = guard(run_limits, linked)
+
+    # Keep everything used in the loop local
+    NOP, SHIFT, POINT, JUMP, MOVE, PRINT, GREATER, LESS, EQUAL, UNEQUAL, SET, ADD, MULTIPLY, EXIT, AFFINE, \
+        WALK, STEP, GUARD, LOOP, GUARD_PRINT = map(int, (
+            opcodes.NOP, opcodes.SHIFT, opcodes.POINT, opcodes.JUMP, opcodes.MOVE, opcodes.PRINT, opcodes.GREATER,
+            opcodes.LESS, opcodes.EQUAL, opcodes.UNEQUAL, opcodes.SET, opcodes.ADD, opcodes.MULTIPLY, opcodes.EXIT,
+            opcodes.AFFINE, opcodes.WALK, opcodes.STEP, opcodes.GUARD, opcodes.LOOP, opcodes.GUARD_PRINT
+        ))
+
+    codes, operands_a, operands_b = linked.opcodes, linked.operands_a, linked.operands_b
+    memory: Union[List[int], array] = sys.memory
+    memory_size = len(memory)
+    memory_pointer = sys.memory_pointer
+    instruction = linked.start
+
+    # Steps are only counted at the end of a block of a guarded program, every instruction of the straight block
+    # from its first instruction up to the jump or compare is a step
+    steps, block_start = run_guard.run_limits.start_steps if run_guard else 0, instruction
+    next_check = run_guard.next_check if run_guard else 0
+
+    try:
+        while True:
+            try:
+                while True:
+                    opcode = codes[instruction]
+
+                    if opcode == ADD:
+                        memory[memory_pointer] += operands_a[instruction]
+                        instruction += 1
+                    elif opcode == STEP:
+                        memory_pointer += operands_a[instruction]
+                        instruction += 1
+                    elif opcode == SHIFT:
+                        new_pointer = memory_pointer + operands_a[instruction]
+                        if not 0 <= new_pointer < memory_size:
+                            checkUpTo(run_guard, steps, instruction, block_start, memory, memory_pointer)
+                            check_range(new_pointer, sys, linked.nodes[linked.indexes[instruction]])
+                        memory_pointer = new_pointer
+                        instruction += 1
+                    elif opcode == JUMP:
+                        instruction = operands_a[instruction]
+                    elif opcode == GREATER:
+                        instruction += 1 if memory[operands_a[instruction]] > memory[operands_b[instruction]] else 2
+                    elif opcode == LESS:
+                        instruction += 1 if memory[operands_a[instruction]] < memory[operands_b[instruction]] else 2
+                    elif opcode == EQUAL:
+                        instruction += 1 if memory[operands_a[instruction]] == memory[operands_b[instruction]] else 2
+                    elif opcode == UNEQUAL:
+                        instruction += 1 if memory[operands_a[instruction]] != memory[operands_b[instruction]] else 2
+                    elif opcode == POINT:
+                        memory_pointer = operands_a[instruction]
+                        instruction += 1
+                    elif opcode == SET:
+                        memory[memory_pointer] = operands_a[instruction]
+                        instruction += 1
+                    elif opcode == MOVE:
+                        memory[operands_a[instruction]] = memory[memory_pointer]
+                        instruction += 1
+                    elif opcode == MULTIPLY:
+                        memory[memory_pointer] *= operands_a[instruction]
+                        instruction += 1
+                    elif opcode == PRINT:
+                        print(memory[memory_pointer], end='')
+                        instruction += 1
+                    elif opcode == AFFINE:
+                        memory[memory_pointer] = \
+                            memory[memory_pointer] * operands_a[instruction] + operands_b[instruction]
+                        instruction += 1
+                    elif opcode == WALK:
+                        node = linked.nodes[operands_a[instruction]]
+                        if not 0 <= memory_pointer + node.low or not memory_pointer + node.high < memory_size:
+                            checkUpTo(run_guard, steps, instruction, block_start, memory, memory_pointer)
+                            sys.memory_pointer = memory_pointer
+                            stop(linked, instruction, sys)
+                        if node.pointer_pos is None:
+                            memory_pointer += node.move_amount
+                        else:
+                            memory_pointer = node.pointer_pos
+                        instruction += 1
+                    elif opcode == NOP:
+                        instruction += 1
+                    elif opcode == EXIT:
+                        break
+                    elif opcode == GUARD:
+                        block_steps = instruction - block_start + 1
+                        steps += block_steps
+                        instruction = operands_a[instruction]
+                        if steps >= next_check:
+                            next_check = run_guard.check(steps, instruction, memory, memory_pointer, block_start,
+                                                         block_steps)
+                        block_start = instruction
+                    elif opcode in guardedCompares:
+                        block_steps = instruction - block_start + 1
+                        steps += block_steps
+                        instruction += 1 if guardedCompares[opcode](
+                            memory[operands_a[instruction]], memory[operands_b[instruction]]) else 2
+                        if steps >= next_check:
+                            next_check = run_guard.check(steps, instruction, memory, memory_pointer, block_start,
+                                                         block_steps)
+                        block_start = instruction
+                    elif opcode == GUARD_PRINT:
+                        checkUpTo(run_guard, steps, instruction, block_start, memory, memory_pointer)
+                        print(memory[memory_pointer], end='')
+                        instruction += 1
+                    elif opcode == LOOP:
+                        instruction = fastForward(linked.loops[operands_b[instruction]], memory, memory_pointer, sys)
+                    else:
+                        checkUpTo(run_guard, steps, instruction, block_start, memory, memory_pointer)
+                        sys.memory_pointer = memory_pointer
+                        stop(linked, instruction, sys)
+                break
+            except OverflowError:
+                # The result does not fit in a memory cell of a fixed word size, store it wrapped around
+                overflow(linked, instruction, memory_pointer, sys)
+                instruction += 1
+    finally:
+        sys.memory_pointer = memory_pointer
+
+    # The steps of the last block are checked before the exit, like the runner checks after every step
+    checkUpTo(run_guard, steps, instruction, block_start, memory, memory_pointer)
+
+    # Like the runner, the final state holds the instruction pointer of the last executed node
+    if instruction != linked.start:
+        sys.instruction_pointer = linked.indexes[instruction] - 1
+    return sys
+
+
+# checkUpTo :: Optional[guard] -> int -> int -> int -> Union[List[int], array] -> int -> None
+def checkUpTo(run_guard: Optional[guard], steps: int, instruction: int, block_start: int,
+                     memory: Union[List[int], array], memory_pointer: int) -> None:
+    """
+    Check the limits with the steps of the block up to an instruction that ends the run or prints, the runner
+    checks the limits after every step so it stops at a limit before it reaches the exit, the error or the print
+    :param run_guard: Guard of the run, None for a run without limits
+    :param steps: Amount of steps before the block
+    :param instruction: Index of the EXIT, GUARD_PRINT or the instruction that raises an error
+    :param block_start: First instruction of the block
+    :param memory: Memory of the run
+    :param memory_pointer: Memory pointer of the run
+    """
+    block_steps = instruction - block_start
+    if run_guard is not None and steps + block_steps >= run_guard.next_check:
+        run_guard.check(steps + block_steps, instruction, memory, memory_pointer, block_start, block_steps)
+
+
+# overflow :: program -> int -> int -> system -> None
+def overflow(linked: program, instruction: int, memory_pointer: int, sys: system) -> None:
+    """
+    Redo an arithmetic instruction of which the result did not fit in the typed memory, the result wraps around
+    :param linked: Program made by the linker
+    :param instruction: Index of the SET, ADD, MULTIPLY or AFFINE instruction
+    :param memory_pointer: Memory pointer of the instruction
+    :param sys: Virtual system with a fixed word size
+    """
+    opcode, a, b = linked.opcodes[instruction], linked.operands_a[instruction], linked.operands_b[instruction]
+    value = sys.memory[memory_pointer]
+
+    if opcode == opcodes.SET:
+        value = a
+    elif opcode == opcodes.ADD:
+        value += a
+    elif opcode == opcodes.MULTIPLY:
+        value *= a
+    else:
+        value = value * a + b
+    sys.memory[memory_pointer] = sys.wrap(value)
+
+
+# stop :: program -> int -> system -> None
+def stop(linked: program, instruction: int, sys: system) -> None:
+    """
+    Raise the error of an instruction that stops the program
+    :param linked: Program made by the linker
+    :param instruction: Index of the FAIL, WALK or OUTSIDE instruction
+    :param sys: Virtual system with the memory pointer before the instruction
+    """
+    if linked.opcodes[instruction] in (opcodes.FAIL, opcodes.WALK):
+        # The runner raises the error of the node
+        sys.instruction_pointer = linked.indexes[instruction]
+        perform(linked.nodes[linked.indexes[instruction]], sys)
+
+    raise RuntimeError(f"Instruction pointer is outside scope, max available: {len(linked.nodes)}, "
+                       f"pointer: {linked.operands_a[instruction] + 1}")
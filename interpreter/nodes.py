@@ -1,6 +1,6 @@
 # Libraries
 from dataclasses import dataclass, field
-from typing import List, Tuple
+from typing import List, Tuple, Optional
 from abc import ABC
 
 # HRA Files
@@ -15,6 +15,9 @@ class BaseNode(ABC):
     row: int = field()
     params: List[found_token] = field(repr=False)
 
+    # Set to False by the bounds analysis when the node can never access outside the memory
+    range_checked: bool = field(default=True, init=False, repr=False)
+
     def __post_init__(self):
         """
         Post init of the class (dataclass)
@@ -136,6 +139,7 @@ class FunctionNode(BaseNode):
     # Node vars
     func_name: str = field(init=False)
     instruction_index: int = field(init=False, default=0)
+    close_index: int = field(init=False, default=0)
 
     def configure(self) -> None:
         """
@@ -279,3 +283,44 @@ class ExitNode(BaseNode):
     name = 'ExitNode'
     amount_params = None
 
+
+
+@dataclass
+class SuperBaseNode(BaseNode):
+    """
+    Superinstruction made by the optimizer out of a run of nodes, the fused nodes stay at their own index in the
+    program so the rows of the nodes after it do not change
+    """
+    # Base vars
+    amount_params = None
+
+    # Node vars
+    fused: List[BaseNode] = field(default_factory=list, repr=False)
+
+
+@dataclass
+class ShiftMemoryNode(SuperBaseNode):
+    # Base vars
+    name = 'ShiftMemoryNode'
+
+    # Node vars
+    move_amount: int = field(default=0)
+    pointer_pos: Optional[int] = field(default=None)
+
+    # Lowest and highest offset of the memory pointer before the first absolute move
+    low: int = field(default=0)
+    high: int = field(default=0)
+
+    # Lowest and highest memory pointer after the first absolute move
+    absolute_low: Optional[int] = field(default=None)
+    absolute_high: Optional[int] = field(default=None)
+
+
+@dataclass
+class ArithmeticNode(SuperBaseNode, SetBaseNode):
+    # Base vars
+    name = 'ArithmeticNode'
+
+    # Node vars, the new value of the memory cell is: value * multiplier + change_value
+    multiplier: int = field(default=1)
+    change_value: int = field(default=0)
@@ -0,0 +1,126 @@
+# Libraries
+from typing import List, Set, Optional
+
+# HRA files
+from .nodes import RightMemoryNode, RightInstructionNode, LeftMemoryNode, LeftInstructionNode, MoveMemoryNode, \
+    MoveInstructionNode, FunctionNode, CloseNode, GreaterNode, LessNode, EqualNode, UnequalNode, SetNode, \
+    IncrementNode, DecrementNode, MultiplyNode, BaseNode, ShiftMemoryNode, ArithmeticNode
+
+pointerNodes = (RightMemoryNode, LeftMemoryNode, MoveMemoryNode)
+arithmeticNodes = (SetNode, IncrementNode, DecrementNode, MultiplyNode)
+
+
+# entryPoints :: List[BaseNode] -> Set[int]
+def entryPoints(nodes: List[BaseNode]) -> Set[int]:
+    """
+    Find all node indexes that can be reached in another way than running the node before it.
+    All jumps in HRA are static so these are known before running the program.
+    :param nodes: Nodes of the program
+    :return: Indexes of the nodes which are jumped to
+    """
+    entries = {0}
+    for index, node in enumerate(nodes):
+        if isinstance(node, RightInstructionNode):
+            targets = [index + node.move_amount]
+        elif isinstance(node, LeftInstructionNode):
+            targets = [index - node.move_amount]
+        elif isinstance(node, MoveInstructionNode):
+            entries.add(node.pointer_pos - 1)
+            continue
+        elif isinstance(node, (FunctionNode, CloseNode)):
+            # Start of the function body or start of the main program
+            targets = [index + 1]
+        elif isinstance(node, (GreaterNode, LessNode, EqualNode, UnequalNode)):
+            targets = [index + 1, index + 2]
+        else:
+            continue
+
+        # A node that runs at its negative index after a jump to a negative index moves relative to that index
+        entries.update(map(lambda target: target - len(nodes), targets))
+        entries.update(targets)
+
+    # Negative indexes are handled the same way as the runner indexes the nodes
+    return set(map(lambda entry: entry % len(nodes), filter(lambda entry: -len(nodes) <= entry < len(nodes), entries)))
+
+
+# fusePointers :: List[BaseNode] -> ShiftMemoryNode
+def fusePointers(run: List[BaseNode]) -> ShiftMemoryNode:
+    """
+    Fuse a run of memory pointer nodes into one net move of the memory pointer
+    :param run: Memory pointer nodes
+    :return: Superinstruction of the run
+    """
+    fused = ShiftMemoryNode(row=run[0].row, params=[], fused=run)
+    offset: int = 0
+    absolute: Optional[int] = None
+
+    for node in run:
+        if isinstance(node, MoveMemoryNode):
+            absolute, offset = node.pointer_pos, 0
+        else:
+            offset += node.move_amount if isinstance(node, RightMemoryNode) else -node.move_amount
+
+        # Keep track of the range the memory pointer visits, this has to be inside the memory
+        if absolute is None:
+            fused.low, fused.high = min(fused.low, offset), max(fused.high, offset)
+        elif fused.absolute_low is None:
+            fused.absolute_low = fused.absolute_high = absolute + offset
+        else:
+            fused.absolute_low = min(fused.absolute_low, absolute + offset)
+            fused.absolute_high = max(fused.absolute_high, absolute + offset)
+
+    if absolute is None:
+        fused.move_amount = offset
+    else:
+        fused.pointer_pos = absolute + offset
+    return fused
+
+
+# fuseArithmetic :: List[BaseNode] -> ArithmeticNode
+def fuseArithmetic(run: List[BaseNode]) -> ArithmeticNode:
+    """
+    Fuse a run of memory value nodes into one calculation: value * multiplier + change_value
+    :param run: Memory value nodes
+    :return: Superinstruction of the run
+    """
+    fused = ArithmeticNode(row=run[0].row, params=[], fused=run)
+    for node in run:
+        if isinstance(node, SetNode):
+            fused.multiplier, fused.change_value = 0, node.change_value
+        elif isinstance(node, IncrementNode):
+            fused.change_value += node.change_value
+        elif isinstance(node, DecrementNode):
+            fused.change_value -= node.change_value
+        else:
+            fused.multiplier *= node.change_value
+            fused.change_value *= node.change_value
+    return fused
+
+
+# optimizer :: List[BaseNode] -> List[BaseNode]
+def optimizer(nodes: List[BaseNode]) -> List[BaseNode]:
+    """
+    Fuse runs of memory pointer nodes and runs of memory value nodes into superinstructions.
+    A run never continues past a node that is jumped to, so every jump still lands on a node that does the same
+    as before. The superinstruction replaces the first node of the run and the other nodes keep their index.
+    :param nodes: Parsed nodes
+    :return: Optimized nodes, the list has the same length and rows as the given nodes
+    """
+    entries = entryPoints(nodes)
+    optimized = list(nodes)
+
+    index = 0
+    while index < len(nodes):
+        kind = next(filter(lambda node_types: isinstance(nodes[index], node_types),
+                           (pointerNodes, arithmeticNodes)), None)
+
+        end = index + 1
+        while kind is not None and end < len(nodes) and end not in entries and isinstance(nodes[end], kind):
+            end += 1
+
+        if end - index > 1:
+            run = nodes[index:end]
+            optimized[index] = fusePointers(run) if kind is pointerNodes else fuseArithmetic(run)
+        index = end
+
+    return optimized
@@ -1,5 +1,5 @@
 # Library
-from typing import List
+from typing import List, Set
 
 # HRA Files
 from .nodes import RightMemoryNode, RightInstructionNode, LeftMemoryNode, LeftInstructionNode, MoveMemoryNode, \
@@ -32,73 +32,61 @@ tokenNodeLinker = {
 }
 
 
-# parseTokens :: List[List[found_token]] -> List[BaseNode]
-def parseTokens(found_tokens: List[List[found_token]]) -> List[BaseNode]:
+# parseRow :: List[found_token] -> BaseNode
+def parseRow(row_tokens: List[found_token]) -> BaseNode:
     """
-    Parse the tokens and convert them to nodes with the tokenNodeLinker dict
-    :param found_tokens: Found tokens by the lexer
-    :return: List with nodes
+    Convert the tokens of a row to a node with the tokenNodeLinker dict
+    :param row_tokens: Found tokens of a single row by the lexer
+    :return: Node of the row
     """
-    # Return empty list when end of list has been reached
-    if len(found_tokens) <= 0:
-        return []
-
-    # Split the tokens
-    (first, *other_tokens), *rest = found_tokens
+    first, *other_tokens = row_tokens
 
     # Raise error when token is not defined
     if first.token not in tokenNodeLinker:
         raise SyntaxError(f"Given key '{first.content}' not a instruction")
 
-    # Return the nodes of given tokens
-    return [tokenNodeLinker[first.token](row=first.row, params=other_tokens)] + parseTokens(rest)
+    return tokenNodeLinker[first.token](row=first.row, params=other_tokens)
 
 
-# parseNodes :: List[BaseNode] -> int -> List[str] -> List[BaseNode]
-def parseNodes(nodes: List[BaseNode], index: int = 0, function_names: List[str] = None) -> List[BaseNode]:
+# parser :: List[List[found_token]] -> List[BaseNode]
+def parser(found_tokens: List[List[found_token]]) -> List[BaseNode]:
     """
-    Check if the correct syntax has been used
-    :param nodes: Nodes of the program
-    :param index: Index of the node which is being parsed
-    :param function_names: List for function names to stop same function names
-    :return: parsed nodes
+    Convert the tokens to nodes and check if the correct syntax has been used in a single pass.
+    Every function is paired with its close function by a stack and there must be an exit in the file.
+    :param found_tokens: All found tokens from the lexer
+    :return: Parsed nodes
     """
-    if function_names is None:
-        function_names = []
-
-    if len(nodes) <= index:
-        return []
+    nodes: List[BaseNode] = []
+    function_names: Set[str] = set()
+    open_functions: List[FunctionNode] = []
+    has_exit = False
 
-    node = nodes[index]
-    if isinstance(node, FunctionNode):
-        # Check if function name already exists
-        if node.func_name in function_names:
-            raise SyntaxError(f"Function name of {node.func_name} defined at line {node.row} is already in use")
+    for index, row_tokens in enumerate(found_tokens):
+        node = parseRow(row_tokens)
 
-        # Check if function is closed
-        close_node = next(filter(lambda p_node: isinstance(p_node[1], CloseNode), enumerate(nodes[index:])), None)
-        if close_node is None:
-            raise SyntaxError(f"Function {node.func_name} defined at line {node.row} has no 'close'")
+        if isinstance(node, FunctionNode):
+            # Check if function name already exists
+            if node.func_name in function_names:
+                raise SyntaxError(f"Function name of {node.func_name} defined at line {node.row} is already in use")
 
-        # Configure the function node
-        node.instruction_index = index
-        node.function_close = close_node
+            node.instruction_index = index
+            function_names.add(node.func_name)
+            open_functions.append(node)
 
-        # Append the function name
-        function_names.append(node.func_name)
+        elif isinstance(node, CloseNode) and open_functions:
+            open_functions.pop().close_index = index
 
-    return [node] + parseNodes(nodes, index+1, function_names)
+        elif isinstance(node, ExitNode):
+            has_exit = True
 
+        nodes.append(node)
 
-# parser :: List[List[found_token]] -> List[BaseNode]
-def parser(found_tokens: List[List[found_token]]) -> List[BaseNode]:
-    """
-    Main function with check if there is an exit in file
-    :param found_tokens: All found tokens from the lexer
-    :return: Parsed nodes
-    """
-    nodes = parseTokens(found_tokens)
-    if not next(filter(lambda node: isinstance(node, ExitNode), nodes), False):
+    if not has_exit:
         raise SyntaxError("No 'exit' found in file")
-    return parseNodes(nodes)
 
+    # Check if every function is closed
+    if open_functions:
+        node = open_functions[0]
+        raise SyntaxError(f"Function {node.func_name} defined at line {node.row} has no 'close'")
+
+    return nodes
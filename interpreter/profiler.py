@@ -0,0 +1,150 @@
+# Libraries
+import time
+from dataclasses import dataclass, field
+from typing import List, Dict, Callable, Any, Optional
+
+# HRA files
+from .nodes import BaseNode, CallNode
+from .system import system
+from .runner import execute
+from .limits import limits
+
+
+@dataclass
+class profile:
+    """
+    Profile of a run, which stores how many times every node has been executed and the wall time it took.
+    Node types and function calls are counted from the nodes afterwards, so the run itself only updates two lists.
+    """
+    nodes: List[BaseNode] = field(repr=False)
+    functions: Dict[str, Any] = field(default_factory=dict, repr=False)
+
+    # Executions and cumulative wall time in nanoseconds of every node index
+    counts: List[int] = field(default_factory=list, repr=False)
+    times: List[int] = field(default_factory=list, repr=False)
+
+    steps: int = field(default=0)
+    total_time: int = field(default=0)
+
+    # Message of the error that stopped the run, the profile then only holds the steps before it
+    error: Optional[str] = field(default=None)
+
+    def rows(self) -> List[Dict[str, Any]]:
+        """
+        Get the executed rows, the row with the most time first
+        :return: Row, node type, executions and time in nanoseconds of every executed row
+        """
+        executed = filter(lambda index: self.counts[index], range(len(self.nodes)))
+        return sorted(map(lambda index: {
+            'row': self.nodes[index].row,
+            'node': type(self.nodes[index]).__name__,
+            'count': self.counts[index],
+            'time': self.times[index],
+        }, executed), key=lambda row: (-row['time'], row['row']))
+
+    def nodeTypes(self) -> List[Dict[str, Any]]:
+        """
+        Get the executed node types, the type with the most time first
+        :return: Node type, executions and time in nanoseconds of every executed node type
+        """
+        node_types: Dict[str, Dict[str, Any]] = {}
+        for row in self.rows():
+            node_type = node_types.setdefault(row['node'], {'node': row['node'], 'count': 0, 'time': 0})
+            node_type['count'] += row['count']
+            node_type['time'] += row['time']
+        return sorted(node_types.values(), key=lambda node_type: -node_type['time'])
+
+    def calls(self) -> Dict[str, int]:
+        """
+        Get the amount of times every registered function has been run, the most called function first
+        :return: Amount of calls of every function
+        """
+        calls = dict.fromkeys(self.functions, 0)
+        for index, node in enumerate(self.nodes):
+            if isinstance(node, CallNode) and node.func_name in calls:
+                calls[node.func_name] += self.counts[index]
+        return dict(sorted(calls.items(), key=lambda call: -call[1]))
+
+    def toDict(self) -> Dict[str, Any]:
+        """
+        Get the whole profile as a dictionary for writing it as JSON
+        :return: Profile with all times in nanoseconds
+        """
+        return {
+            'steps': self.steps,
+            'time': self.total_time,
+            'rows': self.rows(),
+            'nodes': self.nodeTypes(),
+            'calls': self.calls(),
+            'error': self.error,
+        }
+
+    def report(self, limit: int = 20) -> str:
+        """
+        Make a readable report of the hot spots
+        :param limit: Maximum amount of rows in the report
+        :return: Report with the rows, node types and function calls
+        """
+        # percentage :: int -> str
+        def percentage(time_ns: int) -> str:
+            return f'{time_ns / self.total_time:.1%}' if self.total_time else '-'
+
+        lines = [f'Profile: {self.steps} steps in {self.total_time / 1e6:.3f} ms']
+        if self.error is not None:
+            lines.append(f'Stopped early: {self.error}')
+        lines += ['', 'Row'.ljust(8) + 'Node'.ljust(24) + 'Count'.ljust(12) + 'Time (ms)'.ljust(12) + 'Time']
+        lines += list(map(lambda row: str(row['row']).ljust(8) + row['node'].ljust(24) + str(row['count']).ljust(12)
+                          + f"{row['time'] / 1e6:.3f}".ljust(12) + percentage(row['time']), self.rows()[:limit]))
+
+        lines += ['', 'Node'.ljust(32) + 'Count'.ljust(12) + 'Time (ms)'.ljust(12) + 'Time']
+        lines += list(map(lambda node_type: node_type['node'].ljust(32) + str(node_type['count']).ljust(12)
+                          + f"{node_type['time'] / 1e6:.3f}".ljust(12) + percentage(node_type['time']),
+                          self.nodeTypes()))
+
+        if self.functions:
+            lines += ['', 'Function'.ljust(32) + 'Calls']
+            lines += list(map(lambda call: call[0].ljust(32) + str(call[1]), self.calls().items()))
+        return '\n'.join(lines)
+
+
+# profiler :: List[BaseNode] -> system -> Optional[limits] -> Optional[Callable[[profile], None]] -> profile
+def profiler(AST_tree: List[BaseNode], sys: system, run_limits: Optional[limits] = None,
+             partial: Optional[Callable[[profile], None]] = None) -> profile:
+    """
+    Run the AST_Tree alongside the virtual system and profile every executed node. The time of a node is
+    the time between the node before it and the node itself, so it includes the time of the runner.
+    :param AST_tree: Nodes to execute
+    :param sys: Virtual system
+    :param run_limits: Limits of the run
+    :param partial: Called with the profile of the steps before an error that stops the run, before it is raised
+    :return: Profile of the run
+    """
+    counts = [0] * len(AST_tree)
+    times = [0] * len(AST_tree)
+    clock = time.perf_counter_ns
+
+    start = last = clock()
+    error = None
+    try:
+        for node in execute(AST_tree, sys, run_limits):
+            now = clock()
+            index = node.row - 1
+            counts[index] += 1
+            times[index] += now - last
+            last = now
+    except RuntimeError as stopped:
+        error = stopped
+        raise
+    finally:
+        run_profile = profile(
+            nodes=AST_tree,
+            functions=sys.functions,
+            counts=counts,
+            times=times,
+            steps=sum(counts),
+            total_time=clock() - start,
+            error=None if error is None else str(error)
+        )
+        if error is not None and partial is not None:
+            partial(run_profile)
+    return run_profile
@@ -1,13 +1,15 @@
 # Libraries
-from typing import List, Tuple
+from typing import List, Tuple, Dict, Callable, Iterator, Optional
 from copy import deepcopy
 
 # HRA files
 from .nodes import RightMemoryNode, RightInstructionNode, LeftMemoryNode, LeftInstructionNode, MoveMemoryNode, \
     MoveInstructionNode, MoveMemoryValueNode, PrintNode, FunctionNode, CloseNode, CallNode, ExitNode, GreaterNode, \
-    LessNode, EqualNode, UnequalNode, SetNode, IncrementNode, DecrementNode, MultiplyNode, BaseNode
+    LessNode, EqualNode, UnequalNode, SetNode, IncrementNode, DecrementNode, MultiplyNode, BaseNode, \
+    ShiftMemoryNode, ArithmeticNode
 from .decorator import run_generator
 from .system import system, check_range
+from .limits import limits, guardNodes
 
 
 # makeAST :: List[BaseNode] -> system -> Tuple[List[BaseNode], system]
@@ -28,15 +30,240 @@ def makeAST(nodes: List[BaseNode], sys: system) -> Tuple[List[BaseNode], system]
         # Register only the strings for debugging purposes while printing the system
         sys.registered_functions = list(sys.functions.keys())
 
-        # Set the instruction pointer to the first non function node
-        sys.instruction_pointer = next(filter(lambda node: isinstance(node, CloseNode),
-                                              nodes[sys.functions[sys.registered_functions[-1]].row:])).row
+        # Set the instruction pointer to the node after the close of the last function
+        sys.instruction_pointer = sys.functions[sys.registered_functions[-1]].close_index + 1
     else:
         sys.instruction_pointer = 0
 
     return nodes, sys
 
 
+# Handle memory shifters
+# performRightMemory :: RightMemoryNode -> system -> None
+def performRightMemory(node: RightMemoryNode, sys: system) -> None:
+    new_pointer = sys.memory_pointer + node.move_amount
+    if node.range_checked:
+        check_range(new_pointer, sys, node)
+    sys.memory_pointer = new_pointer
+
+
+# performLeftMemory :: LeftMemoryNode -> system -> None
+def performLeftMemory(node: LeftMemoryNode, sys: system) -> None:
+    new_pointer = sys.memory_pointer - node.move_amount
+    if node.range_checked:
+        check_range(new_pointer, sys, node)
+    sys.memory_pointer = new_pointer
+
+
+# performMoveMemory :: MoveMemoryNode -> system -> None
+def performMoveMemory(node: MoveMemoryNode, sys: system) -> None:
+    if node.range_checked:
+        check_range(node.pointer_pos, sys, node)
+    sys.memory_pointer = node.pointer_pos
+
+
+# Handle instruction shifters
+# Reason for extra int manipulations is because the runner will add 1 to the instruction_pointer
+# by every iteration over the nodes therefor these extra -1 and +1 are needed
+# performRightInstruction :: RightInstructionNode -> system -> None
+def performRightInstruction(node: RightInstructionNode, sys: system) -> None:
+    sys.instruction_pointer += node.move_amount - 1
+
+
+# performLeftInstruction :: LeftInstructionNode -> system -> None
+def performLeftInstruction(node: LeftInstructionNode, sys: system) -> None:
+    sys.instruction_pointer -= node.move_amount + 1
+
+
+# performMoveInstruction :: MoveInstructionNode -> system -> None
+def performMoveInstruction(node: MoveInstructionNode, sys: system) -> None:
+    sys.instruction_pointer = node.pointer_pos - 2
+
+
+# Handle memory mover
+# performMoveMemoryValue :: MoveMemoryValueNode -> system -> None
+def performMoveMemoryValue(node: MoveMemoryValueNode, sys: system) -> None:
+    if node.range_checked:
+        check_range(node.pointer_pos, sys, node)
+    sys.memory[node.pointer_pos] = sys.memory[sys.memory_pointer]
+
+
+# Handle print
+# performPrint :: PrintNode -> system -> None
+def performPrint(_: PrintNode, sys: system) -> None:
+    print(sys.memory[sys.memory_pointer], end='')
+
+
+# Handle function
+# performFunction :: FunctionNode -> system -> None
+def performFunction(node: FunctionNode, sys: system) -> None:
+    sys.instruction_pointer = node.instruction_index
+
+
+# Handle function caller
+# performCall :: CallNode -> system -> None
+def performCall(node: CallNode, sys: system) -> None:
+    if node.func_name not in sys.functions:
+        raise RuntimeError(f"Function '{node.func_name}' not found")
+    sys.instruction_pointer = sys.functions[node.func_name].instruction_index
+
+
+# Handle all comparisons, the next node is skipped when the comparison fails
+# performGreater :: GreaterNode -> system -> None
+def performGreater(node: GreaterNode, sys: system) -> None:
+    if node.range_checked:
+        check_range([node.lhs, node.rhs], sys, node)
+    if not sys.memory[node.lhs] > sys.memory[node.rhs]:
+        sys.instruction_pointer += 1
+
+
+# performLess :: LessNode -> system -> None
+def performLess(node: LessNode, sys: system) -> None:
+    if node.range_checked:
+        check_range([node.lhs, node.rhs], sys, node)
+    if not sys.memory[node.lhs] < sys.memory[node.rhs]:
+        sys.instruction_pointer += 1
+
+
+# performEqual :: EqualNode -> system -> None
+def performEqual(node: EqualNode, sys: system) -> None:
+    if node.range_checked:
+        check_range([node.lhs, node.rhs], sys, node)
+    if not sys.memory[node.lhs] == sys.memory[node.rhs]:
+        sys.instruction_pointer += 1
+
+
+# performUnequal :: UnequalNode -> system -> None
+def performUnequal(node: UnequalNode, sys: system) -> None:
+    if node.range_checked:
+        check_range([node.lhs, node.rhs], sys, node)
+    if not sys.memory[node.lhs] != sys.memory[node.rhs]:
+        sys.instruction_pointer += 1
+
+
+# Handle all memory value manipulators
+# performSet :: SetNode -> system -> None
+def performSet(node: SetNode, sys: system) -> None:
+    sys.memory[sys.memory_pointer] = node.change_value
+
+
+# performIncrement :: IncrementNode -> system -> None
+def performIncrement(node: IncrementNode, sys: system) -> None:
+    sys.memory[sys.memory_pointer] += node.change_value
+
+
+# performDecrement :: DecrementNode -> system -> None
+def performDecrement(node: DecrementNode, sys: system) -> None:
+    sys.memory[sys.memory_pointer] -= node.change_value
+
+
+# performMultiply :: MultiplyNode -> system -> None
+def performMultiply(node: MultiplyNode, sys: system) -> None:
+    sys.memory[sys.memory_pointer] *= node.change_value
+
+
+# Handle superinstructions of the optimizer, these continue after the last fused node
+# performShiftMemory :: ShiftMemoryNode -> system -> None
+def performShiftMemory(node: ShiftMemoryNode, sys: system) -> None:
+    pointer = sys.memory_pointer
+    if node.range_checked and (
+            pointer + node.low < 0 or pointer + node.high >= len(sys.memory) or
+            node.absolute_low is not None and (node.absolute_low < 0 or node.absolute_high >= len(sys.memory))):
+        # Perform the fused nodes one by one so the error is raised at the right row
+        for fused_node in node.fused:
+            perform(fused_node, sys)
+    elif node.pointer_pos is None:
+        sys.memory_pointer = pointer + node.move_amount
+    else:
+        sys.memory_pointer = node.pointer_pos
+    sys.instruction_pointer += len(node.fused) - 1
+
+
+# performArithmetic :: ArithmeticNode -> system -> None
+def performArithmetic(node: ArithmeticNode, sys: system) -> None:
+    sys.memory[sys.memory_pointer] = sys.memory[sys.memory_pointer] * node.multiplier + node.change_value
+    sys.instruction_pointer += len(node.fused) - 1
+
+
+# Handle the memory value manipulators of a system with a fixed word size, the results wrap around
+# performWrappedSet :: SetNode -> system -> None
+def performWrappedSet(node: SetNode, sys: system) -> None:
+    sys.memory[sys.memory_pointer] = sys.wrap(node.change_value)
+
+
+# performWrappedIncrement :: IncrementNode -> system -> None
+def performWrappedIncrement(node: IncrementNode, sys: system) -> None:
+    sys.memory[sys.memory_pointer] = sys.wrap(sys.memory[sys.memory_pointer] + node.change_value)
+
+
+# performWrappedDecrement :: DecrementNode -> system -> None
+def performWrappedDecrement(node: DecrementNode, sys: system) -> None:
+    sys.memory[sys.memory_pointer] = sys.wrap(sys.memory[sys.memory_pointer] - node.change_value)
+
+
+# performWrappedMultiply :: MultiplyNode -> system -> None
+def performWrappedMultiply(node: MultiplyNode, sys: system) -> None:
+    sys.memory[sys.memory_pointer] = sys.wrap(sys.memory[sys.memory_pointer] * node.change_value)
+
+
+# performWrappedArithmetic :: ArithmeticNode -> system -> None
+def performWrappedArithmetic(node: ArithmeticNode, sys: system) -> None:
+    sys.memory[sys.memory_pointer] = sys.wrap(sys.memory[sys.memory_pointer] * node.multiplier + node.change_value)
+    sys.instruction_pointer += len(node.fused) - 1
+
+
+# performNothing :: BaseNode -> system -> None
+def performNothing(_: BaseNode, __: system) -> None:
+    pass
+
+
+# Dispatch table which links every node type to the function that performs it
+nodePerformers: Dict[type, Callable[[BaseNode, system], None]] = {
+    RightMemoryNode:      performRightMemory,
+    LeftMemoryNode:       performLeftMemory,
+    MoveMemoryNode:       performMoveMemory,
+    RightInstructionNode: performRightInstruction,
+    LeftInstructionNode:  performLeftInstruction,
+    MoveInstructionNode:  performMoveInstruction,
+    MoveMemoryValueNode:  performMoveMemoryValue,
+    PrintNode:            performPrint,
+    FunctionNode:         performFunction,
+    CloseNode:            performNothing,
+    CallNode:             performCall,
+    GreaterNode:          performGreater,
+    LessNode:             performLess,
+    EqualNode:            performEqual,
+    UnequalNode:          performUnequal,
+    SetNode:              performSet,
+    IncrementNode:        performIncrement,
+    DecrementNode:        performDecrement,
+    MultiplyNode:         performMultiply,
+    ShiftMemoryNode:      performShiftMemory,
+    ArithmeticNode:       performArithmetic,
+}
+
+
+# Dispatch table for a system with a fixed word size
+wrappedPerformers: Dict[type, Callable[[BaseNode, system], None]] = {
+    **nodePerformers,
+    SetNode:              performWrappedSet,
+    IncrementNode:        performWrappedIncrement,
+    DecrementNode:        performWrappedDecrement,
+    MultiplyNode:         performWrappedMultiply,
+    ArithmeticNode:       performWrappedArithmetic,
+}
+
+
+# performers :: system -> Dict[type, Callable[[BaseNode, system], None]]
+def performers(sys: system) -> Dict[type, Callable[[BaseNode, system], None]]:
+    """
+    Get the dispatch table which performs the nodes on the given system
+    :param sys: Virtual system
+    :return: Dispatch table
+    """
+    return wrappedPerformers if sys.word_size else nodePerformers
+
+
 # perform :: BaseNode -> system -> system
 def perform(node: BaseNode, sys: system) -> system:
     """
@@ -45,86 +272,63 @@ def perform(node: BaseNode, sys: system) -> system:
     :param sys: System where it will be ran on
     :return: the new system
     """
-    # Handle memory shifters
-    if isinstance(node, (RightMemoryNode, LeftMemoryNode, MoveMemoryNode)):
-        if isinstance(node, RightMemoryNode):
-            func = lambda pointer: pointer + node.move_amount
-        elif isinstance(node, LeftMemoryNode):
-            func = lambda pointer: pointer - node.move_amount
-        else:
-            func = lambda _: node.pointer_pos
-
-        new_pointer = func(sys.memory_pointer)
-        check_range(new_pointer, sys, node)
-        sys.memory_pointer = new_pointer
-
-    # Handle instruction shifters
-    # Reason for extra int manipulations is because the runner will add 1 to the instruction_pointer
-    # by every iteration over the nodes therefor these extra -1 and +1 are needed
-    elif isinstance(node, (RightInstructionNode, LeftInstructionNode, MoveInstructionNode)):
-        if isinstance(node, RightInstructionNode):
-            func = lambda pointer: pointer + (node.move_amount - 1)
-        elif isinstance(node, LeftInstructionNode):
-            func = lambda pointer: pointer - (node.move_amount + 1)
-        else:
-            func = lambda _: (node.pointer_pos - 2)
-
-        sys.instruction_pointer = func(sys.instruction_pointer)
-
-    # Handle memory mover
-    elif isinstance(node, MoveMemoryValueNode):
-        check_range(node.pointer_pos, sys, node)
-        sys.memory[node.pointer_pos] = sys.memory[sys.memory_pointer]
-
-    # Handle print
-    elif isinstance(node, PrintNode):
-        print(sys.memory[sys.memory_pointer], end='')
-
-    # Handle function
-    elif isinstance(node, FunctionNode):
-        sys.instruction_pointer = node.instruction_index
-
-    # Handle function caller
-    elif isinstance(node, CallNode):
-        if node.func_name not in sys.functions:
-            raise RuntimeError(f"Function '{node.func_name}' not found")
-        return perform(sys.functions[node.func_name], sys)
-
-    # Handle all comparisons
-    elif isinstance(node, (GreaterNode, LessNode, EqualNode, UnequalNode)):
-        if isinstance(node, GreaterNode):
-            func = lambda rhs, lhs: rhs > lhs
-        elif isinstance(node, LessNode):
-            func = lambda rhs, lhs: rhs < lhs
-        elif isinstance(node, EqualNode):
-            func = lambda rhs, lhs: rhs == lhs
-        else:
-            func = lambda rhs, lhs: rhs != lhs
+    performers(sys).get(type(node), performNothing)(node, sys)
 
-        check_range([node.lhs, node.rhs], sys, node)
+    # Return new system state
+    return sys
+
+
+# execute :: List[BaseNode] -> system -> Optional[limits] -> Iterator[BaseNode]
+def execute(AST_tree: List[BaseNode], sys: system, run_limits: Optional[limits] = None) -> Iterator[BaseNode]:
+    """
+    Execute the AST_Tree on the virtual system in a flat loop, so the stack depth stays the same no matter how
+    many nodes are executed. The system is changed in place, every performed node is yielded right after it has
+    been performed and before the instruction pointer moves on to the next node.
+    :param AST_tree: Nodes to execute
+    :param sys: Virtual system
+    :param run_limits: Limits of the run, every node counts as a step
+    :return: Iterator over the performed nodes
+    """
+    if run_limits:
+        yield from guardNodes(execute(AST_tree, sys), sys, run_limits)
+        return
 
-        if func(sys.memory[node.lhs], sys.memory[node.rhs]):
-            new_pointer = sys.instruction_pointer
-        else:
-            new_pointer = sys.instruction_pointer + 1
+    node_performers = performers(sys)
+    nodes_amount = len(AST_tree)
+    instruction_pointer = sys.instruction_pointer
 
-        sys.instruction_pointer = new_pointer
+    while True:
+        # Try to get the instruction, if outside list raise a runtime error
+        try:
+            execution_node = AST_tree[instruction_pointer]
+        except IndexError:
+            raise RuntimeError(f"Instruction pointer is outside scope, max available: {nodes_amount}, "
+                               f"pointer: {instruction_pointer + 1}")
 
-    # Handle all memory value manipulators
-    elif isinstance(node, (SetNode, IncrementNode, DecrementNode, MultiplyNode)):
-        if isinstance(node, SetNode):
-            func = lambda _: node.change_value
-        elif isinstance(node, IncrementNode):
-            func = lambda value: value + node.change_value
-        elif isinstance(node, DecrementNode):
-            func = lambda value: value - node.change_value
-        else:
-            func = lambda value: value * node.change_value
+        # Stop executing when the ExitNode has been reached
+        node_type = type(execution_node)
+        if node_type is ExitNode:
+            return
 
-        sys.memory[sys.memory_pointer] = func(sys.memory[sys.memory_pointer])
+        sys.instruction_pointer = instruction_pointer
+        node_performers.get(node_type, performNothing)(execution_node, sys)
+        yield execution_node
 
-    # Return new system state
-    return sys
+        instruction_pointer = sys.instruction_pointer + 1
+
+
+# stream :: List[BaseNode] -> system -> Optional[limits] -> Iterator[system]
+def stream(AST_tree: List[BaseNode], sys: system, run_limits: Optional[limits] = None) -> Iterator[system]:
+    """
+    Lazily run the AST_Tree alongside the virtual system and return the state after every executed node.
+    The same (live) system is returned every time, copy it when a state needs to be kept.
+    :param AST_tree: Nodes to execute
+    :param sys: Virtual system
+    :param run_limits: Limits of the run
+    :return: Iterator over all the states
+    """
+    for _ in execute(AST_tree, sys, run_limits):
+        yield sys
 
 
 # runner :: List[BaseNode] -> system -> List[system]
@@ -138,20 +342,5 @@ def runner(AST_tree: List[BaseNode], sys: system) -> List[system]:
     :param sys: Virtual system
     :return: List of all the states
     """
-    # Try to get the instruction, if outside list raise a runtime error
-    try:
-        execution_node = AST_tree[sys.instruction_pointer]
-    except IndexError:
-        raise RuntimeError(f"Instruction pointer is outside scope, max available: {len(AST_tree)}, "
-                           f"pointer: {sys.instruction_pointer + 1}")
-
-    # Check if instance is
-    if isinstance(execution_node, ExitNode):
-        return deepcopy(sys)
-
-    else:
-        yield deepcopy(perform(execution_node, sys))
-
-    sys.instruction_pointer += 1
-    yield from runner(AST_tree, sys)
-
+    for state in stream(AST_tree, sys):
+        yield deepcopy(state)
@@ -0,0 +1,320 @@
+# Libraries
+import os
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from contextlib import ExitStack
+from multiprocessing import Pool
+from typing import List, Dict, Tuple, Callable, Any, Optional
+
+# HRA files
+from .lexer import lexer
+from .parser import parser
+from .interpreter import prepareNodes
+from .linker import linker, program
+from .loops import accelerator
+from .system import system
+from .limits import limits
+from .jit import jitCompile
+from .batch import loadProgram, runLoaded, run_result
+
+# Port the server listens on when no port is given
+defaultPort = 8421
+
+# Amount of linked programs the server keeps when no cache size is given
+defaultCacheSize = 128
+
+
+@dataclass
+class cached_program:
+    """
+    Linked program in the cache of a worker, with the functions the jit compiled it to by whether they are guarded
+    """
+    linked: program = field(repr=False)
+    template: system = field(repr=False)
+    compiled: Dict[bool, Callable] = field(default_factory=dict, repr=False)
+
+
+@dataclass
+class program_cache:
+    """
+    LRU cache of linked programs, a program is stored by the hash of its source and the options it is prepared with
+    """
+    size: int
+    programs: Dict[str, cached_program] = field(default_factory=OrderedDict, repr=False)
+
+    def get(self, key: str, prepare: Callable[[], cached_program]) -> Tuple[cached_program, bool]:
+        """
+        Get a program from the cache, a missing program is prepared and stored as the most recently used one
+        :param key: Key of the program
+        :param prepare: Function which links the program
+        :return: Linked program and whether it was taken from the cache
+        """
+        if key in self.programs:
+            self.programs.move_to_end(key)
+            return self.programs[key], True
+
+        prepared = prepare()
+        self.programs[key] = prepared
+        while len(self.programs) > self.size:
+            self.programs.popitem(last=False)
+        return prepared, False
+
+
+# Cache of the worker process, set once by initWorker
+workerCache: Optional[program_cache] = None
+
+
+@dataclass
+class server_state:
+    """
+    Everything the request handlers of the server share. Every worker is a pool of a single process with its own
+    cache, a program always goes to the same worker so it is only linked once and never sent to a worker.
+    """
+    pools: List[Any] = field(repr=False)
+    cache_size: int
+
+    # Limits of every run, a request can override every limit
+    run_limits: limits = field(default_factory=limits)
+
+    # Statistics of the caches of the workers, the programs of a worker are counted at its last request
+    hits: int = field(default=0)
+    misses: int = field(default=0)
+    programs: Dict[int, int] = field(default_factory=dict)
+    lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+
+# programKey :: bytes -> int -> bool -> int -> str
+def programKey(source: bytes, memory_size: int, optimize: bool, word_size: int) -> str:
+    """
+    Get the cache key of a program, the bounds analysis depends on the memory size so it is part of the key
+    :param source: Source of the program
+    :param memory_size: Size of the memory
+    :param optimize: Fuse nodes and fast-forward counted loops
+    :param word_size: Size of a memory cell in bits
+    :return: Hash of the program and its options
+    """
+    digest = hashlib.sha256(source)
+    digest.update(f' {memory_size} {int(optimize)} {word_size}'.encode())
+    return digest.hexdigest()
+
+
+# prepareProgram :: bytes -> int -> bool -> int -> cached_program
+def prepareProgram(source: bytes, memory_size: int, optimize: bool, word_size: int) -> cached_program:
+    """
+    Parse and link a program for the cache
+    :param source: Source of the program
+    :param memory_size: Size of the memory
+    :param optimize: Fuse nodes and fast-forward counted loops
+    :param word_size: Size of a memory cell in bits
+    :return: Linked program and the prepared system without input
+    """
+    nodes, template = prepareNodes(parser(lexer(source.decode())), memory_size, [], optimize, word_size)
+    linked = linker(nodes, template)
+    return cached_program(accelerator(linked) if optimize else linked, template)
+
+
+# initWorker :: int -> None
+def initWorker(cache_size: int) -> None:
+    """
+    Make the cache of a worker process
+    :param cache_size: Maximum amount of linked programs in the cache
+    """
+    global workerCache
+    workerCache = program_cache(cache_size)
+
+
+# runRequest :: Tuple[str, bytes, int, bool, int, bool, limits, List[List[int]], bool] -> Tuple[List[run_result],
+#               bool, int]
+def runRequest(job: Tuple[str, bytes, int, bool, int, bool, limits, List[List[int]], bool]) \
+        -> Tuple[List[run_result], bool, int]:
+    """
+    Run a program on input vectors in a worker, the program is only linked when it is not in the cache
+    :param job: Key, source, memory size, optimize and word size of the program, whether to use the jit, limits of
+        every run, input vectors and whether to keep the final states
+    :return: Results in the order of the inputs, whether the program was taken from the cache and the amount of
+        programs in the cache
+    """
+    key, source, memory_size, optimize, word_size, use_jit, run_limits, inputs, keep_state = job
+    cached, hit = workerCache.get(key, lambda: prepareProgram(source, memory_size, optimize, word_size))
+
+    guarded = bool(run_limits)
+    if use_jit and guarded not in cached.compiled:
+        cached.compiled[guarded] = jitCompile(cached.linked, cached.template, guarded)
+    loadProgram(cached.linked, cached.template, use_jit, run_limits, cached.compiled.get(guarded))
+    return runLoaded(inputs, keep_state), hit, len(workerCache.programs)
+
+
+# requestNumber :: Dict[str, Any] -> str -> Any -> int -> bool -> Any
+def requestNumber(request: Dict[str, Any], name: str, default: Any, minimum: int = 0, integer: bool = True) -> Any:
+    """
+    Get a number field of a request, null disables a limit
+    :param request: Decoded request
+    :param name: Name of the field
+    :param default: Value when the request does not have the field
+    :param minimum: Lowest allowed value
+    :param integer: Only allow integers
+    :return: Value of the field
+    """
+    value = request.get(name, default)
+    if value is None:
+        return None
+    kind = 'an integer' if integer else 'a number'
+    if isinstance(value, bool) or not isinstance(value, int if integer else (int, float)) or value < minimum:
+        raise ValueError(f"The field '{name}' has to be {kind} of at least {minimum}, not {json.dumps(value)}")
+    return value
+
+
+# stateDict :: system -> Dict[str, Any]
+def stateDict(sys: system) -> Dict[str, Any]:
+    """
+    Get the final state of a run for the JSON response
+    :param sys: System after the run
+    :return: State of the system
+    """
+    return {
+        'memory_pointer': sys.memory_pointer,
+        'instruction_pointer': sys.instruction_pointer,
+        'memory': list(sys.memory),
+        'registered_functions': sys.registered_functions,
+    }
+
+
+# resultDict :: run_result -> Dict[str, Any]
+def resultDict(result: run_result) -> Dict[str, Any]:
+    """
+    Get the result of a run for the JSON response
+    :param result: Result of the run
+    :return: Output, exit status, error, time and the final state when it is kept
+    """
+    response = {
+        'output': result.output,
+        'status': 'exited' if result.error is None else 'error',
+        'error': result.error,
+        'duration': result.duration,
+    }
+    if result.state is not None:
+        response['state'] = stateDict(result.state)
+    return response
+
+
+# handleRun :: server_state -> Dict[str, Any] -> Dict[str, Any]
+def handleRun(state: server_state, request: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Run the program of a request on all its input vectors. The fields of a request have the names of the
+    long options of the CLI: file or source, input or inputs, memsize, optimize, wordSize, jit, state,
+    maxSteps, timeout and cycleDetection.
+    :param state: State of the server
+    :param request: Decoded request
+    :return: Results of all runs and whether the program was taken from the cache
+    """
+    if 'source' in request:
+        source = str(request['source']).encode()
+    elif 'file' in request:
+        with open(str(request['file']), 'rb') as file:
+            source = file.read()
+    else:
+        raise ValueError("A request needs a 'source' or a 'file'")
+
+    inputs: List[List[int]] = request['inputs'] if 'inputs' in request else [request.get('input', [])]
+    if not isinstance(inputs, list) or not all(map(lambda memory_input: isinstance(memory_input, list) and all(
+            map(lambda value: isinstance(value, int), memory_input)), inputs)):
+        raise ValueError("The inputs have to be lists of integers")
+
+    memory_size, optimize, word_size = requestNumber(request, 'memsize', 32, 1), bool(request.get('optimize')), \
+        requestNumber(request, 'wordSize', 0)
+    if memory_size is None or word_size is None:
+        raise ValueError("The fields 'memsize' and 'wordSize' can not be null")
+    run_limits = limits(requestNumber(request, 'maxSteps', state.run_limits.max_steps),
+                        requestNumber(request, 'timeout', state.run_limits.timeout, integer=False),
+                        requestNumber(request, 'cycleDetection', state.run_limits.cycle_interval, 1))
+
+    # A program always goes to the same worker, which keeps it in its cache
+    key = programKey(source, memory_size, optimize, word_size)
+    worker = int(key[:16], 16) % len(state.pools)
+    results, cached, programs = state.pools[worker].apply(runRequest, ((
+        key, source, memory_size, optimize, word_size, bool(request.get('jit')), run_limits, inputs,
+        bool(request.get('state'))),))
+
+    with state.lock:
+        state.hits += cached
+        state.misses += not cached
+        state.programs[worker] = programs
+    return {'cached': cached, 'results': list(map(resultDict, results))}
+
+
+class RequestHandler(BaseHTTPRequestHandler):
+    """
+    Handler of the HTTP requests, POST /run runs a program and GET /status describes the server
+    """
+    server_version = 'HRA'
+
+    def respond(self, status: int, body: Dict[str, Any]) -> None:
+        """
+        Send a JSON response
+        :param status: HTTP status code
+        :param body: Body of the response
+        """
+        content = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def do_GET(self) -> None:
+        state: server_state = self.server.state
+        if self.path != '/status':
+            self.respond(404, {'error': f"Unknown path {self.path}"})
+            return
+        self.respond(200, {
+            'programs': sum(state.programs.values()),
+            'cache_size': state.cache_size,
+            'hits': state.hits,
+            'misses': state.misses,
+            'workers': len(state.pools),
+        })
+
+    def do_POST(self) -> None:
+        if self.path != '/run':
+            self.respond(404, {'error': f"Unknown path {self.path}"})
+            return
+
+        try:
+            request = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+            if not isinstance(request, dict):
+                raise ValueError("A request has to be a JSON object")
+            self.respond(200, handleRun(self.server.state, request))
+        except (ValueError, TypeError, OSError, SyntaxError, RuntimeError) as error:
+            # Invalid requests and programs that can not be parsed or linked
+            self.respond(400, {'error': str(error)})
+
+    def log_message(self, format: str, *args: Any) -> None:
+        # Every request is answered with its own status, so the server does not log the requests
+        pass
+
+
+# serve :: int -> int -> Optional[int] -> Optional[limits] -> str -> None
+def serve(port: int = defaultPort, cache_size: int = defaultCacheSize, workers: Optional[int] = None,
+          run_limits: Optional[limits] = None, host: str = '127.0.0.1') -> None:
+    """
+    Run programs for HTTP/JSON requests until the server is interrupted. The runs are spread over worker processes
+    by program, every worker keeps its parsed and linked programs in an LRU cache.
+    :param port: Port to listen on
+    :param cache_size: Maximum amount of linked programs in the cache of every worker
+    :param workers: Amount of worker processes, defaults to all cpus
+    :param run_limits: Default limits of every run
+    :param host: Address to listen on, only local requests are accepted by default
+    """
+    with ExitStack() as stack:
+        pools = list(map(lambda _: stack.enter_context(Pool(1, initializer=initWorker, initargs=(cache_size,))),
+                         range(workers or os.cpu_count())))
+        http_server = stack.enter_context(ThreadingHTTPServer((host, port), RequestHandler))
+        http_server.state = server_state(pools, cache_size, run_limits or limits())
+        try:
+            http_server.serve_forever()
+        except KeyboardInterrupt:
+            pass
@@ -1,16 +1,26 @@
 # Libraries
+from array import array
 from dataclasses import dataclass, field, InitVar
 from typing import List, Union, Any, Dict
 
+# Array typecodes of the memory for every supported word size in bits
+wordTypes: Dict[int, str] = {
+    32: 'i',
+    64: 'q',
+}
+
 
 @dataclass
 class system:
     memory_size: InitVar[int]
     memory_input: InitVar[List[int]]
 
+    # Size of a memory cell in bits, 0 keeps the cells as unbounded python ints
+    word_size: int = field(default=0, repr=False)
+
     memory_pointer: int = field(default=0, init=False)
     instruction_pointer: int = field(default=0, init=False)
-    memory: List[int] = field(default_factory=list, init=False)
+    memory: Union[List[int], array] = field(default_factory=list, init=False)
     functions: Dict[str, Any] = field(default_factory=dict, init=False, repr=False)
     registered_functions: List[str] = field(default_factory=list, init=False)
 
@@ -18,10 +28,32 @@ class system:
         """
         Post init
         :param memory_size: Size of the memory
+        :param memory_input: Values of the first memory cells
         """
         if len(memory_input) > memory_size:
             raise RuntimeError('Requested memory size is smaller than the given input')
-        self.memory = memory_input + [0] * (memory_size - len(memory_input))
+
+        if not self.word_size:
+            self.memory = list(memory_input) + [0] * (memory_size - len(memory_input))
+            return
+
+        if self.word_size not in wordTypes:
+            raise RuntimeError(f"Word size {self.word_size} is not supported, choose from {list(wordTypes)}")
+
+        # Fixed width cells are stored in a typed array, values wrap around like the registers of the compiler
+        self.memory = array(wordTypes[self.word_size], map(self.wrap, memory_input))
+        self.memory.frombytes(bytes(self.memory.itemsize * (memory_size - len(memory_input))))
+
+    def wrap(self, value: int) -> int:
+        """
+        Wrap the value around to a signed integer of the word size
+        :param value: Value which will be stored in the memory
+        :return: Value that fits in a memory cell
+        """
+        if not self.word_size:
+            return value
+        half = 1 << (self.word_size - 1)
+        return ((value + half) & ((half << 1) - 1)) - half
 
 
 # check_range :: Union[List[int], int] -> system -> BaseNode -> bool
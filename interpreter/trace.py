@@ -0,0 +1,195 @@
+# Libraries
+from array import array
+from bisect import bisect_right
+from dataclasses import dataclass, field
+from typing import List, Dict, Any, Iterator, Optional, Union
+
+# HRA files
+from .nodes import BaseNode, SetBaseNode, MoveMemoryValueNode
+from .system import system
+from .runner import execute
+from .limits import limits
+
+
+@dataclass
+class trace:
+    """
+    Execution trace of a run which only stores what every executed node changed on the virtual system.
+    Every step stores its instruction pointer, memory pointer moves and memory writes are stored together with
+    the step they happened in and a full copy of the memory (keyframe) is stored every keyframe_interval writes.
+    The memory of a step is rebuilt from the nearest keyframe, by redoing the new values of the writes after an
+    earlier keyframe or undoing the old values of the writes before a later one.
+    """
+    keyframe_interval: int = field(default=1024)
+    word_size: int = field(default=0)
+
+    functions: Dict[str, Any] = field(default_factory=dict, repr=False)
+    registered_functions: List[str] = field(default_factory=list)
+
+    # Instruction pointer of every step
+    instruction_pointers: array = field(default_factory=lambda: array('q'), repr=False)
+
+    # Memory pointer moves (step, new memory pointer)
+    pointer_steps: array = field(default_factory=lambda: array('q'), repr=False)
+    pointer_values: array = field(default_factory=lambda: array('q'), repr=False)
+
+    # Memory writes (step, cell index, old value, new value)
+    write_steps: array = field(default_factory=lambda: array('q'), repr=False)
+    write_cells: array = field(default_factory=lambda: array('q'), repr=False)
+    write_old: List[int] = field(default_factory=list, repr=False)
+    write_new: List[int] = field(default_factory=list, repr=False)
+
+    # Full memory copies, keyframe n is the memory after the first n * keyframe_interval writes
+    keyframes: List[Union[List[int], array]] = field(default_factory=list, repr=False)
+
+    def __len__(self) -> int:
+        """
+        :return: Amount of recorded steps
+        """
+        return len(self.instruction_pointers)
+
+    def record(self, node: BaseNode, sys: system, shadow: Union[List[int], array]) -> None:
+        """
+        Record the changes the given node made to the system
+        :param node: Node which has just been performed
+        :param sys: System the node has been performed on
+        :param shadow: Copy of the memory before the node was performed, is updated with the write of the node
+        """
+        step = len(self.instruction_pointers)
+        self.instruction_pointers.append(sys.instruction_pointer)
+
+        if not self.pointer_values or self.pointer_values[-1] != sys.memory_pointer:
+            self.pointer_steps.append(step)
+            self.pointer_values.append(sys.memory_pointer)
+
+        # Only these nodes can change a memory cell, an ArithmeticNode is a SetBaseNode as well
+        if isinstance(node, SetBaseNode):
+            cell = sys.memory_pointer
+        elif isinstance(node, MoveMemoryValueNode):
+            cell = node.pointer_pos
+        else:
+            return
+
+        old_value, new_value = shadow[cell], sys.memory[cell]
+        if old_value == new_value:
+            return
+
+        shadow[cell] = new_value
+        self.write_steps.append(step)
+        self.write_cells.append(cell)
+        self.write_old.append(old_value)
+        self.write_new.append(new_value)
+
+        if not len(self.write_steps) % self.keyframe_interval:
+            self.keyframes.append(shadow[:])
+
+    def makeState(self, step: int, memory: Union[List[int], array]) -> system:
+        """
+        Make a system of the given step with the given memory
+        :param step: Step of the state
+        :param memory: Memory of the state, will be copied into the system
+        :return: Materialized system
+        """
+        state = system(len(memory), memory, self.word_size)
+        state.memory_pointer = self.pointer_values[bisect_right(self.pointer_steps, step) - 1]
+        state.instruction_pointer = self.instruction_pointers[step]
+        state.functions = self.functions
+        state.registered_functions = self.registered_functions[:]
+        return state
+
+    def state(self, step: int) -> system:
+        """
+        Materialize the system after the given step from the nearest keyframe
+        :param step: Step of the state, negative steps count from the end like a list
+        :return: The system after the given step
+        """
+        if step < 0:
+            step += len(self)
+        if not 0 <= step < len(self):
+            raise IndexError(f"Step {step} is not in the trace, amount of steps: {len(self)}")
+
+        writes = bisect_right(self.write_steps, step)
+        keyframe = writes // self.keyframe_interval
+
+        if keyframe + 1 < len(self.keyframes) and (keyframe + 1) * self.keyframe_interval - writes < \
+                writes - keyframe * self.keyframe_interval:
+            # The later keyframe is closer, undo the writes after the step
+            memory = self.keyframes[keyframe + 1][:]
+            for write in reversed(range(writes, (keyframe + 1) * self.keyframe_interval)):
+                memory[self.write_cells[write]] = self.write_old[write]
+        else:
+            memory = self.keyframes[keyframe][:]
+            for write in range(keyframe * self.keyframe_interval, writes):
+                memory[self.write_cells[write]] = self.write_new[write]
+
+        return self.makeState(step, memory)
+
+    def __getitem__(self, step: int) -> system:
+        return self.state(step)
+
+    def __iter__(self) -> Iterator[system]:
+        """
+        Replay all the steps in order, this only applies the writes of every step instead of starting at a keyframe
+        :return: Iterator over all states
+        """
+        memory = self.keyframes[0][:]
+        write = 0
+        for step in range(len(self)):
+            while write < len(self.write_steps) and self.write_steps[write] == step:
+                memory[self.write_cells[write]] = self.write_new[write]
+                write += 1
+            yield self.makeState(step, memory)
+
+
+# emptyTrace :: system -> int -> trace
+def emptyTrace(sys: system, keyframe_interval: int = 1024) -> trace:
+    """
+    Make the trace of a run that has not started yet
+    :param sys: Virtual system before the run
+    :param keyframe_interval: Amount of writes between full copies of the memory
+    :return: Trace without steps, its first keyframe is the memory before the run
+    """
+    return trace(
+        keyframe_interval=keyframe_interval,
+        word_size=sys.word_size,
+        functions=sys.functions,
+        registered_functions=sys.registered_functions[:],
+        keyframes=[sys.memory[:]]
+    )
+
+
+# recordStates :: List[BaseNode] -> system -> trace -> Optional[limits] -> Iterator[system]
+def recordStates(AST_tree: List[BaseNode], sys: system, recording: trace,
+                 run_limits: Optional[limits] = None) -> Iterator[system]:
+    """
+    Lazily run the AST_Tree alongside the virtual system, record every step in the trace and return the state of
+    every step as soon as it has been recorded. Every state is a new system made from the trace.
+    :param AST_tree: Nodes to execute
+    :param sys: Virtual system
+    :param recording: Empty trace of the run, made by emptyTrace
+    :param run_limits: Limits of the run
+    :return: Iterator over all the states
+    """
+    shadow = recording.keyframes[0][:]
+    for node in execute(AST_tree, sys, run_limits):
+        recording.record(node, sys, shadow)
+        yield recording.makeState(len(recording) - 1, shadow)
+
+
+# tracer :: List[BaseNode] -> system -> int -> Optional[limits] -> trace
+def tracer(AST_tree: List[BaseNode], sys: system, keyframe_interval: int = 1024,
+           run_limits: Optional[limits] = None) -> trace:
+    """
+    Run the AST_Tree alongside the virtual system and record the changes of every node in a trace
+    :param AST_tree: Nodes to execute
+    :param sys: Virtual system
+    :param keyframe_interval: Amount of writes between full copies of the memory
+    :param run_limits: Limits of the run
+    :return: Trace of the run
+    """
+    recording = emptyTrace(sys, keyframe_interval)
+    shadow = recording.keyframes[0][:]
+    for node in execute(AST_tree, sys, run_limits):
+        recording.record(node, sys, shadow)
+
+    return recording
@@ -3,27 +3,38 @@
 .align   4
 
 _start:
-	MOV  fp, sp
-	MOV  r4, sp
+	LDR  fp, =_memory_top
+	MOV  r4, fp
 	SUB  r4, #4
-	SUB  sp, #128
-_input:
-	MOV  r0, #5
-	STR  r0, [fp, #-4]
-_start_final:
+	MOV  r8, sp
+	SUB  sp, #4096
+	MOV  r6, sp
 	B    sommig
+.ltorg
 _exit:
-	MOV  sp, fp
+	BL   flush_output
 	MOV  r7, #0x1
 	MOV  r0, #1
 	SWI  0
 
 show_memory:
-	PUSH {r0, r7, lr}
+	PUSH {r0, lr}
+	LDR  r0, [r4]
+	STR  r0, [r6]
+	ADD  r6, #4
+	CMP  r6, r8
+	BLEQ flush_output
+	POP  {r0, pc}
+
+flush_output:
+	PUSH {r0, r1, r2, r7, lr}
+	SUB  r1, r8, #4096
+	SUB  r2, r6, r1
 	MOV  r0, #1
 	MOV  r7, #0x4
 	SWI  0
-	POP  {r0, r7, pc}
+	MOV  r6, r1
+	POP  {r0, r1, r2, r7, pc}
 
 node_1:
 @ Start of function sommig
@@ -68,8 +79,13 @@ node_12:
 node_13:
 	BL   function_sommig
 node_14:
-	MOV  r1, r4
-	MOV  r2, #4
 	BL   show_memory
 node_15:
 	B    _exit
+
+.section .data
+.align   4
+_memory_bottom:
+.space   124
+.word    5
+_memory_top:
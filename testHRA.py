@@ -1,5 +1,30 @@
-from typing import List
-from subprocess import run, PIPE
+import io
+import os
+import time
+import argparse
+import tempfile
+from contextlib import redirect_stdout
+from multiprocessing import Pool
+from dataclasses import dataclass, field
+from typing import List, Dict, Tuple, Optional
+
+from interpreter import prepare_interpreter, system, BaseNode, execute, limits
+from interpreter.batch import loadBatch, runInput, cloneSystem
+from interpreter.cache import cacheDirectory
+from compiler import writeAssembly, outputReader, inputWriter, toolchainAvailable, buildProgram, runProgram
+
+
+# Size of the memory every test case runs with
+testMemorySize = 32
+
+# Options a case can set, with the names of the long options of the CLI
+caseOptions = ('wordSize', 'maxSteps', 'cycleDetection')
+
+# Every case runs on all engines, with and without optimizing
+testEngines = ('runner', 'machine', 'jit')
+
+# Every compiled case runs on the programs built with every combination of -op (fused nodes) and -oa (registers)
+compilerVariants = ((False, False), (False, True), (True, False), (True, True))
 
 
 class col:
@@ -8,53 +33,249 @@ class col:
     RESET = '\033[0m'
 
 
-def testHRAFile(filename: str, expected_output: str, expected_input: List[str] = ' '):
-    """
-    Test the given filename with the expected input and output
-    :param filename: Filename which will be tested
-    :param expected_output: Expected output
-    :param expected_input: Expected Input
-    """
-    print(f'{",".join(expected_input)}'.ljust(5), expected_output.ljust(20), f"{filename}".ljust(40), end='')
-    if expected_input == ' ':
-        expected_input = ['0']
-
-    it_status = run(
-        ['python3', 'hra-toolkit.py', '-f', filename, '-it', '-so', '-i', *expected_input],
-        stdout=PIPE
-    )
-    status = it_status.stdout.decode('ascii')[:-1]
-    print(f'{col.FAIL}x' if status != expected_output else f'{col.OK}o', end=f'{col.RESET} ')
-
-    cp_status = run(
-        ['python3', 'hra-toolkit.py', '-f', filename, '-cr', '-so', '-i', *expected_input],
-        stdout=PIPE
-    )
-    status = cp_status.stdout.decode('ascii')[:-1]
-    print(f'{col.FAIL}x' if status != expected_output else f'{col.OK}o', end=f'{col.RESET} ')
-
-    if it_status.returncode:
-        if cp_status.returncode:
-            print('Interpreter and Compiler failed!')
-        print('Interpreter failed!')
-    elif cp_status.returncode:
-        print('Compiler failed!')
+@dataclass
+class test_case:
+    filename: str
+    memory_input: List[int]
+    expected_output: str
+    options: Dict[str, int] = field(default_factory=dict)
+
+    def limits(self) -> limits:
+        """
+        Get the limits of the case
+        :return: Limits, which are all disabled when the case sets none
+        """
+        return limits(self.options.get('maxSteps'), None, self.options.get('cycleDetection'))
+
+    def compiled(self) -> bool:
+        """
+        Check if the compiler can run the case, it has no limits and its registers are 32 bits
+        :return: True if the case runs on the compiler as well
+        """
+        return not self.limits() and self.options.get('wordSize', 0) in (0, 32)
+
+
+def readOptions(field_text: str) -> Dict[str, int]:
+    """
+    Read the options of a case, which are written as name=value separated by spaces
+    :param field_text: Options field of the case
+    :return: Value of every given option
+    """
+    options = dict(map(lambda option: option.split('=', 1), field_text.split()))
+    for name in options:
+        if name not in caseOptions:
+            raise ValueError(f"Unknown case option {name}, choose from {list(caseOptions)}")
+    return {name: int(value) for name, value in options.items()}
+
+
+def readCases(filename: str) -> List[test_case]:
+    """
+    Read the test cases, every row holds the file, the inputs, the expected output and optionally the options
+    separated by |
+    :param filename: Location of the cases file
+    :return: All test cases in order
+    """
+    with open(filename, 'r') as file:
+        rows = filter(lambda row: row.strip() and not row.lstrip().startswith('~'), file.read().splitlines())
+
+    return list(map(
+        lambda fields: test_case(fields[0].strip(), list(map(int, fields[1].split())), fields[2].strip(),
+                                 readOptions(fields[3]) if len(fields) > 3 else {}),
+        map(lambda row: row.split('|'), rows)
+    ))
+
+
+def runRunner(nodes: List[BaseNode], template: system, memory_input: List[int], run_limits: limits) -> str:
+    """
+    Run a single test case on the runner
+    :param nodes: Prepared nodes of the program
+    :param template: Prepared system of the program
+    :param memory_input: Inputs of the case
+    :param run_limits: Limits of the case
+    :return: Output of the case, or its error
+    """
+    output = io.StringIO()
+    try:
+        with redirect_stdout(output):
+            for _ in execute(nodes, cloneSystem(template, memory_input), run_limits):
+                pass
+    except RuntimeError as error:
+        return str(error)
+    return output.getvalue()
+
+
+def interpretCase(case: test_case) -> Tuple[Dict[str, str], float]:
+    """
+    Run a test case in this process on every engine, with and without optimizing
+    :param case: Test case
+    :return: Output of every engine and the time of the machine without optimizing
+    """
+    outputs: Dict[str, str] = {}
+    duration = 0.0
+    for optimize in (False, True):
+        nodes, template = prepare_interpreter(case.filename, testMemorySize, [], optimize,
+                                              case.options.get('wordSize', 0))
+        suffix = ' -op' if optimize else ''
+        outputs['runner' + suffix] = runRunner(nodes, template, case.memory_input, case.limits())
+
+        for engine in testEngines[1:]:
+            loadBatch(nodes, template, engine == 'jit', case.limits(), optimize)
+            result = runInput((0, case.memory_input))
+            outputs[engine + suffix] = result.output if result.error is None else result.error
+            if engine == 'machine' and not optimize:
+                duration = result.duration
+    return outputs, duration
+
+
+def variantName(optimize: bool, optimize_assembly: bool) -> str:
+    """
+    Get the name of a variant of the compiler from the short options it is built with
+    :param optimize: The nodes are fused by -op
+    :param optimize_assembly: The assembly keeps memory cells in a register by -oa
+    :return: Name of the variant
+    """
+    return ' '.join(filter(None, ('-op' if optimize else '', '-oa' if optimize_assembly else ''))) or 'no options'
+
+
+def buildCase(job: Tuple[List[BaseNode], system, bool, str, str, str]) -> Tuple[str, str]:
+    """
+    Compile and build a variant of a program once for all its test cases, the program reads its inputs when it runs
+    :param job: Prepared nodes and system of the program, whether the assembly keeps memory cells in a register,
+        name of the program, location of the assembly and location of the build cache
+    :return: Location of the executable and an empty error, or no location and the error of the build
+    """
+    nodes, template, optimize_assembly, link_name, asm_filename, cache_directory = job
+    with open(asm_filename, 'w') as file:
+        writeAssembly(nodes, template, link_name, [], file, runtime_input=True, optimize=optimize_assembly)
+
+    try:
+        return buildProgram(asm_filename, cache_directory=cache_directory)[0], ''
+    except RuntimeError as error:
+        return '', str(error)
+
+
+def runCase(job: Tuple[str, str, List[int]]) -> Tuple[str, float]:
+    """
+    Run a single test case on the built program
+    :param job: Location of the executable, error of the build and inputs of the case
+    :return: Output and time of the case
+    """
+    elf_filename, error, memory_input = job
+    if error:
+        return error, 0.0
+
+    start = time.perf_counter()
+    output, _ = runProgram(elf_filename, inputWriter(memory_input))
+    return outputReader(output), time.perf_counter() - start
+
+
+def printCase(case: test_case, interpreted: Tuple[Dict[str, str], float],
+              compiled: Optional[Tuple[Dict[str, str], float]]) -> bool:
+    """
+    Print the verdict of a test case as a row of the table
+    :param case: Test case
+    :param interpreted: Output of every engine and time of the interpreter
+    :param compiled: Output of every variant of the compiler and time of the compiler without options, None when
+        the compiler is skipped
+    :return: True if the case passed
+    """
+    print(','.join(map(str, case.memory_input)).ljust(5), case.expected_output[:20].ljust(20),
+          case.filename.ljust(40), end='')
+
+    failed_engines = list(filter(lambda engine: interpreted[0][engine] != case.expected_output, interpreted[0]))
+    it_failed = bool(failed_engines)
+    print(f'{col.FAIL}x' if it_failed else f'{col.OK}o', end=f'{col.RESET} ')
+
+    failed_variants = [] if compiled is None else list(filter(
+        lambda variant: compiled[0][variant] != case.expected_output, compiled[0]))
+    cp_failed = bool(failed_variants)
+    if compiled is None:
+        print('-', end=' ')
+    else:
+        print(f'{col.FAIL}x' if cp_failed else f'{col.OK}o', end=f'{col.RESET} ')
+
+    print(f'{interpreted[1] * 1000:.2f} ms'.ljust(12), end='')
+    print('-'.ljust(12) if compiled is None else f'{compiled[1] * 1000:.2f} ms'.ljust(12), end='')
+
+    if it_failed and cp_failed:
+        print(f'Interpreter ({", ".join(failed_engines)}) and Compiler ({", ".join(failed_variants)}) failed!')
+    elif it_failed:
+        print(f'Interpreter ({", ".join(failed_engines)}) failed!')
+    elif cp_failed:
+        print(f'Compiler ({", ".join(failed_variants)}) failed!')
     else:
         print('Finished tests successfully!')
+    return not it_failed and not cp_failed
 
 
-if __name__ == '__main__':
-    print(f'In'.ljust(6), 'Out'.ljust(21), 'Filename'.ljust(40), 'I ', 'C ', 'Verdict', sep='')
-    testHRAFile('programs/test_recursion.hra', '012345678910')
-    testHRAFile('programs/test_recursion.hra', '5678910', ['5'])
-    testHRAFile('programs/test_recursion.hra', '910', ['9'])
-    testHRAFile('programs/sommig.hra', '0', ['0'])
-    testHRAFile('programs/sommig.hra', '1', ['1'])
-    testHRAFile('programs/sommig.hra', '2', ['2'])
-    testHRAFile('programs/sommig.hra', '3', ['3'])
-    testHRAFile('programs/is_even.hra', '1', ['0'])
-    testHRAFile('programs/is_even.hra', '0', ['1'])
-    testHRAFile('programs/is_even.hra', '1', ['2'])
-    testHRAFile('programs/is_even.hra', '0', ['3'])
+def testHRA(cases_filename: str, workers: Optional[int] = None) -> bool:
+    """
+    Run all test cases. The interpreter runs every case in this process on the runner, the machine and the jit,
+    with and without optimizing, while every variant of every program is compiled and built once by a pool of
+    workers, which then run the compiled cases on every variant. Cases with limits or another word size than the
+    compiler only run on the interpreter.
+    :param cases_filename: Location of the cases file
+    :param workers: Amount of processes for the compiled cases, defaults to all cpus
+    :return: True if all cases passed
+    """
+    start = time.perf_counter()
+    cases = readCases(cases_filename)
+
+    use_compiler = toolchainAvailable()
+    if not use_compiler:
+        print('The ARM toolchain is not found, the compiler cases are skipped\n')
+
+    print(f'In'.ljust(6), 'Out'.ljust(21), 'Filename'.ljust(40), 'I ', 'C ', 'Time I'.ljust(12), 'Time C'.ljust(12),
+          'Verdict', sep='')
 
+    # Start building the programs first, so they are built by the workers while the interpreter runs
+    compiled = [None] * len(cases)
+    if use_compiler:
+        programs = {}
+        for filename in dict.fromkeys(map(lambda case: case.filename, filter(test_case.compiled, cases))):
+            for optimize in (False, True):
+                programs[filename, optimize] = prepare_interpreter(filename, testMemorySize, [], optimize)
+        variants = [(filename, optimize, optimize_assembly) for filename, optimize in programs
+                    for variant_optimize, optimize_assembly in compilerVariants if variant_optimize == optimize]
+
+        directory = tempfile.TemporaryDirectory()
+        pool = Pool(workers)
+        pending = pool.map_async(buildCase, map(
+            lambda index, variant: (*programs[variant[:2]], variant[2],
+                                    os.path.splitext(os.path.basename(variant[0]))[0],
+                                    os.path.join(directory.name, f'program_{index}.asm'),
+                                    os.path.join(os.path.dirname(os.path.abspath(variant[0])), cacheDirectory)),
+            range(len(variants)), variants
+        ))
+
+    interpreted = list(map(interpretCase, cases))
+
+    if use_compiler:
+        # Every variant of a program is built once, the cases only run it with their inputs
+        builds = dict(zip(variants, pending.get()))
+        runs = [(index, variant) for index in range(len(cases)) if cases[index].compiled()
+                for variant in variants if variant[0] == cases[index].filename]
+        for (index, variant), (output, duration) in zip(runs, pool.map(runCase, map(
+                lambda run: (*builds[run[1]], cases[run[0]].memory_input), runs))):
+            outputs, case_duration = compiled[index] or ({}, 0.0)
+            outputs[variantName(*variant[1:])] = output
+            compiled[index] = (outputs, duration if variant[1:] == (False, False) else case_duration)
+        pool.close()
+        pool.join()
+        directory.cleanup()
+
+    passed = sum(map(lambda index: printCase(cases[index], interpreted[index], compiled[index]), range(len(cases))))
+    print(f'\n{passed}/{len(cases)} cases passed in {time.perf_counter() - start:.2f} s')
+    return passed == len(cases)
+
+
+if __name__ == '__main__':
+    cli_parser = argparse.ArgumentParser(description='Test the HRA interpreter and compiler')
+    cli_parser.add_argument('cases', type=str, nargs='?', default='testHRA.cases',
+                            help='Location of the cases file')
+    cli_parser.add_argument('-w', '--workers', type=int, default=None,
+                            help='Amount of processes that run the compiled cases, defaults to all cpus')
+    args = cli_parser.parse_args()
 
+    if not testHRA(args.cases, args.workers):
+        raise SystemExit(1)